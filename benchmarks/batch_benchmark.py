@@ -0,0 +1,81 @@
+"""
+Users per minute of the batch recommendation job versus calling ``/grants``
+once per user in series.
+
+Uses the stub backends of ``grants_load_test`` (blocking vector store, LLM
+with fixed latency) and a scratch database seeded with ``--users`` users of
+distinct profiles, so every user needs a generation. Run from the
+repository root:
+
+    python -m benchmarks.batch_benchmark --users 500 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import httpx
+
+from benchmarks.grants_load_test import stub_clients
+from src.backend import app as backend
+from src.backend.batch import run_batch
+
+
+def seed_users(count):
+    with backend.SessionLocal() as db:
+        db.add_all(
+            backend.User(
+                email=f"user{i}@example.gov",
+                name=f"User {i}",
+                occupation=f"occupation {i}",
+                income=str(10000 + i),
+                demographics="single",
+            )
+            for i in range(count)
+        )
+        db.commit()
+
+
+async def run_serial(clients, sample):
+    app = backend.app
+    app.dependency_overrides[backend.get_clients] = lambda: clients
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=None
+    ) as client:
+        started = time.perf_counter()
+        for i in range(sample):
+            await client.post("/grants", json={"email": f"user{i}@example.gov"})
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--serial-sample", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--store-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    args.max_llm_calls = args.concurrency
+    seed_users(args.users)
+
+    async def measure():
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial = await run_serial(stub_clients(args), args.serial_sample)
+            stats = await run_batch(stub_clients(args), args.page_size)
+        return serial, stats
+
+    serial, stats = asyncio.run(measure())
+    print(f"serial /grants  {args.serial_sample / serial * 60:8.0f} users/min")
+    print(
+        f"batch job       {stats.users_per_minute:8.0f} users/min"
+        f"  ({stats.users} users, {stats.generated} generated, {stats.failed} failed)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Chunk and embedding-call counts: one-line units versus token windows.
+
+Builds a fixed corpus from the synthetic site pages plus a long markdown
+document shaped like LlamaParse PDF output, then reports how many texts each
+strategy would send to the embedding model. Run from the repository root:
+
+    python -m benchmarks.chunk_benchmark
+"""
+
+import argparse
+import math
+
+from benchmarks.site_fixture import render_page
+from src.functions.crawl.chunk import ChunkConfig, chunk_text
+from src.functions.crawl.fetch import FetchedPage, extract_text
+from src.functions.vector.embedding import MAX_DOCUMENTS
+
+
+def pdf_markdown(sections: int = 40) -> str:
+    parts = ["# Program Handbook"]
+    for i in range(sections):
+        parts.append(f"## Part {i}: Assistance program {i}")
+        parts.append("### Eligibility")
+        for j in range(6):
+            parts.append(
+                f"Households in category {j} qualify for program {i} when their "
+                f"gross monthly income is below {120 + j * 10} percent of the "
+                "federal poverty guideline and they live in the state."
+            )
+        parts.append("### How to apply")
+        for j in range(4):
+            parts.append(
+                f"Step {j + 1}: submit form {i}-{j} with proof of identity, "
+                "residency and income to your local office."
+            )
+    return "\n".join(parts)
+
+
+def corpus(pages: int, fanout: int):
+    for page_id in range(pages):
+        page = FetchedPage(
+            url=f"http://example.gov/page/{page_id}",
+            status_code=200,
+            content=render_page(page_id, pages, fanout),
+            content_type="text/html",
+        )
+        yield page.url, extract_text(page)
+    yield "http://example.gov/handbook.pdf", pdf_markdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--overlap", type=int, default=30)
+    args = parser.parse_args()
+
+    documents = list(corpus(args.pages, args.fanout))
+    config = ChunkConfig(max_tokens=args.max_tokens, overlap_tokens=args.overlap)
+
+    lines = set()
+    for _, text in documents:
+        lines.update(line for line in text.split("\n") if line)
+    chunks = [c for url, text in documents for c in chunk_text(text, url, config=config)]
+
+    for label, count in (("lines", len(lines)), ("chunks", len(chunks))):
+        calls = math.ceil(count / MAX_DOCUMENTS)
+        print(f"{label:<7} texts={count:<6} embedding_calls={calls}")
+    tokens = [c.token_count for c in chunks]
+    print(f"chunk tokens: mean={sum(tokens) / len(tokens):.1f} max={max(tokens)}")
+
+
+if __name__ == "__main__":
+    main()
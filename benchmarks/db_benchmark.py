@@ -0,0 +1,179 @@
+"""
+Per-endpoint latency on a large database before and after migration.
+
+Builds a scratch SQLite database with the original schema (no index or
+foreign key on ``applied_grants.user_id``/``grant_id``) and seeds it with
+``--applications`` applications spread over ``--users`` users, then times
+``/applied-grants``, ``/update-grant-status`` and ``/apply-grant`` for
+random users. ``migrate`` then adds the indexes and foreign keys in place
+and the same requests are timed again. Run from the repository root:
+
+    python -m benchmarks.db_benchmark --applications 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+# The backend opens its database on import; point it at a scratch file
+WORKDIR = tempfile.mkdtemp(prefix="db-bench-")
+os.chdir(WORKDIR)
+DB_PATH = os.path.join(WORKDIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DB_AUTO_MIGRATE"] = "false"
+
+import httpx  # noqa: E402
+from fastapi import Request  # noqa: E402
+
+from src.backend import app as backend  # noqa: E402
+from src.backend.migrations import migrate  # noqa: E402
+
+# The tables as the first version of the backend created them
+ORIGINAL_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY, email VARCHAR, name VARCHAR, occupation VARCHAR,
+    income VARCHAR, demographics VARCHAR, affiliated_organization VARCHAR,
+    birthdate DATE
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE grants (
+    id VARCHAR PRIMARY KEY, name VARCHAR, deadline DATE,
+    documents_needed VARCHAR, steps_to_apply VARCHAR, link VARCHAR,
+    user_id INTEGER REFERENCES users (id)
+);
+CREATE INDEX ix_grants_id ON grants (id);
+CREATE TABLE applied_grants (
+    id VARCHAR PRIMARY KEY, user_id INTEGER, grant_id VARCHAR,
+    status INTEGER, current_status VARCHAR
+);
+CREATE INDEX ix_applied_grants_id ON applied_grants (id);
+"""
+
+
+def seed(users: int, grants: int, applications: int):
+    rng = random.Random(0)
+    db = sqlite3.connect(DB_PATH)
+    db.executescript(ORIGINAL_SCHEMA)
+    db.executemany(
+        "INSERT INTO users (id, email, name) VALUES (?, ?, ?)",
+        ((i, f"user{i}@example.gov", f"User {i}") for i in range(1, users + 1)),
+    )
+    db.executemany(
+        "INSERT INTO grants (id, name, deadline, link, user_id) VALUES (?, ?, ?, ?, ?)",
+        (
+            (f"grant-{i}", f"Grant {i}", "2026-12-31", "https://example.gov", 1)
+            for i in range(grants)
+        ),
+    )
+    db.executemany(
+        "INSERT INTO applied_grants VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                f"application-{i}",
+                rng.randrange(1, users + 1),
+                f"grant-{rng.randrange(grants)}",
+                10,
+                "Application Submitted",
+            )
+            for i in range(applications)
+        ),
+    )
+    db.commit()
+    db.close()
+
+
+def sample_applications(count: int):
+    db = sqlite3.connect(DB_PATH)
+    rows = db.execute(
+        "SELECT id, user_id FROM applied_grants ORDER BY random() LIMIT ?", (count,)
+    ).fetchall()
+    db.close()
+    return rows
+
+
+async def current_user(request: Request):
+    return backend.User(id=int(request.headers["x-user-id"]))
+
+
+async def time_endpoints(applications, grants: int):
+    app = backend.app
+    app.dependency_overrides[backend.get_current_user] = current_user
+    names = ["GET /applied-grants", "PUT /update-grant-status", "POST /apply-grant"]
+    timings = {name: [] for name in names}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        for application_id, user_id in applications:
+            headers = {"x-user-id": str(user_id)}
+            requests = [
+                ("GET /applied-grants", client.get("/applied-grants", headers=headers)),
+                (
+                    "PUT /update-grant-status",
+                    client.put(
+                        "/update-grant-status",
+                        json={
+                            "grant_id": application_id,
+                            "status": 50,
+                            "currentStatus": "In Review",
+                        },
+                        headers=headers,
+                    ),
+                ),
+                (
+                    "POST /apply-grant",
+                    client.post(
+                        "/apply-grant",
+                        json={"grant_id": f"grant-{random.randrange(grants)}"},
+                        headers=headers,
+                    ),
+                ),
+            ]
+            for name, request in requests:
+                started = time.perf_counter()
+                response = await request
+                timings[name].append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+    return timings
+
+
+def report(label, timings):
+    for name, samples in timings.items():
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        p50 = statistics.median(samples)
+        print(f"{label:<7} {name:<26} p50={p50:8.2f}ms  p95={p95:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--applications", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--grants", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed(args.users, args.grants, args.applications)
+    elapsed = time.perf_counter() - started
+    print(f"seeded {args.applications} applications in {elapsed:.1f}s")
+
+    applications = sample_applications(args.requests)
+    report("before", asyncio.run(time_endpoints(applications, args.grants)))
+
+    started = time.perf_counter()
+    changes = migrate(backend.engine, backend.Base.metadata)
+    elapsed = time.perf_counter() - started
+    print(f"migrated in {elapsed:.1f}s: {'; '.join(changes)}")
+
+    report("after", asyncio.run(time_endpoints(applications, args.grants)))
+
+
+if __name__ == "__main__":
+    main()
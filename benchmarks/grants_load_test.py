@@ -0,0 +1,250 @@
+"""
+Requests per second of ``/grants`` on the blocking path versus the async path,
+and time-to-first-token of ``/grants/stream``.
+
+Both paths run in-process against stubbed backends: the vector store blocks
+for ``--store-latency`` per query (as the sync Pinecone SDK does) and the LLM
+takes ``--llm-latency`` per completion. ``/grants-sync`` reproduces the old
+``def`` endpoint, which holds a threadpool thread and a pooled database
+connection for the whole request. While the load runs, a probe calls
+``/applied-grants`` to show how much unrelated endpoints wait behind it. For the streaming endpoint the ``ttft``
+column is the server-reported time to the first token. The recommendation
+cache is off except in the last row, which repeats ``/grants`` with it on.
+Run from the repository root:
+
+    python -m benchmarks.grants_load_test --users 100 --duration 10
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="grants-load-")
+
+# The app opens ./test.db on import; point it and the caches at a scratch dir
+sys.path.insert(0, REPO_ROOT)
+os.chdir(WORKDIR)
+os.environ.setdefault("LLAMA_CLOUD_API_KEY", "unused")
+os.environ["EMBEDDER"] = "local"
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(WORKDIR, "embedding_cache.db")
+
+from fastapi import Depends  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from src.backend import app as backend  # noqa: E402
+from src.backend.recommendations import RecommendationCache  # noqa: E402
+from src.functions.crawl.web import get_matching_embedding  # noqa: E402
+from src.functions.vector.version import IndexVersion  # noqa: E402
+
+PROFILE = {
+    "occupation": "Farm worker",
+    "income": "18000",
+    "demographics": "Single parent, two children",
+    "affiliated_organization": "None",
+}
+
+
+class FakeStore:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def query(self, vector, top_k, namespace):
+        time.sleep(self.latency)
+        return {
+            "matches": [
+                {"metadata": {"text": f"Program {i} supports low-income households."}}
+                for i in range(top_k)
+            ]
+        }
+
+    def query_many(self, vectors, top_k, namespace):
+        # Same overlap of round trips as PineconeStore.query_many
+        with ThreadPoolExecutor(8) as pool:
+            return list(pool.map(lambda v: self.query(v, top_k, namespace), vectors))
+
+
+def completion(text):
+    message = SimpleNamespace(content=text)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+TOKENS = ["- SNAP", "\n", "- WIC", "\n", "- LIHEAP"]
+
+
+class FakeAsyncLLM:
+    def __init__(self, latency):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, stream=False):
+        if stream:
+            return self._stream()
+        await asyncio.sleep(self.latency)
+        return completion("".join(TOKENS))
+
+    async def _stream(self):
+        # The same total latency, spread evenly across the tokens
+        for token in TOKENS:
+            await asyncio.sleep(self.latency / len(TOKENS))
+            delta = SimpleNamespace(content=token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeSyncLLM(FakeAsyncLLM):
+    def create(self, model, messages):
+        time.sleep(self.latency)
+        return completion("".join(TOKENS))
+
+
+class NoCache:
+    def get(self, key):
+        return None
+
+    def put(self, key, content):
+        pass
+
+
+def stub_clients(args):
+    return SimpleNamespace(
+        pc=None,
+        vector_store=FakeStore(args.store_latency),
+        llm=FakeAsyncLLM(args.llm_latency),
+        sync_llm=FakeSyncLLM(args.llm_latency),
+        llm_slots=asyncio.Semaphore(args.max_llm_calls),
+        index_version=IndexVersion(os.path.join(WORKDIR, "index_version.db")),
+        recommendations=NoCache(),
+    )
+
+
+def add_sync_route(app):
+    # The pre-async endpoint: blocking db, retrieval and completion in one thread
+    @app.post("/grants-sync")
+    def get_grants_sync(
+        request: backend.EmailRequest,
+        db: Session = Depends(backend.get_db),
+        clients=Depends(backend.get_clients),
+    ):
+        user = db.query(backend.User).filter(backend.User.email == request.email).first()
+        query = f"What kind of benefits government offers to {user.occupation}"
+        results = get_matching_embedding(clients.pc, query, store=clients.vector_store)
+        knowledge = "\n".join(m["metadata"]["text"] for m in results["matches"])
+        result = clients.sync_llm.chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": knowledge}]
+        )
+        return {"content": result.choices[0].message.content}
+
+
+def seed_user(email):
+    with backend.SessionLocal() as db:
+        user = backend.User(email=email, name="Load Test", **PROFILE)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+    return user
+
+
+def first_token_seconds(body):
+    for block in body.split("\n\n"):
+        if block.startswith("event: done"):
+            return json.loads(block.split("data: ", 1)[1])["ttft_ms"] / 1000
+    return None
+
+
+async def run_load(client, path, email, users, duration):
+    latencies, ttfts, errors = [], [], 0
+    stop_at = time.perf_counter() + duration
+
+    async def user_loop():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            response = await client.post(path, json={"email": email})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+                if path.endswith("/stream"):
+                    ttfts.append(first_token_seconds(response.text))
+            else:
+                errors += 1
+
+    probe = []
+
+    async def probe_loop():
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            await client.get("/applied-grants")
+            probe.append(time.perf_counter() - start)
+            await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(probe_loop(), *(user_loop() for _ in range(users)))
+    elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, latencies, ttfts, probe, errors
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] * 1000
+
+
+async def main_async(args):
+    app = backend.app
+    add_sync_route(app)
+    user = seed_user("load-test@example.gov")
+    clients = stub_clients(args)
+    app.dependency_overrides[backend.get_clients] = lambda: clients
+    app.dependency_overrides[backend.get_current_user] = lambda: user
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=None
+    ) as client:
+        paths = (
+            ("sync  ", "/grants-sync"),
+            ("async ", "/grants"),
+            ("stream", "/grants/stream"),
+            ("cached", "/grants"),
+        )
+        for label, path in paths:
+            if label == "cached":
+                clients.recommendations = RecommendationCache()
+            # Silence the per-request timing log
+            with contextlib.redirect_stdout(io.StringIO()):
+                rps, latencies, ttfts, probe, errors = await run_load(
+                    client, path, user.email, args.users, args.duration
+                )
+            print(
+                f"{label} rps={rps:7.1f}  p50={percentile(latencies, 50):7.1f}ms"
+                f"  p95={percentile(latencies, 95):7.1f}ms"
+                f"  ttft p50={percentile(ttfts, 50):7.1f}ms  errors={errors}"
+                f"  /applied-grants p50={percentile(probe, 50):7.1f}ms"
+                f" p95={percentile(probe, 95):7.1f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--store-latency", type=float, default=0.05)
+    parser.add_argument("--max-llm-calls", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
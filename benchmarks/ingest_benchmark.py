@@ -0,0 +1,113 @@
+"""
+Wall time and peak memory of batch-then-upsert versus the streaming pipeline.
+
+A fake embedder sleeps ``--embed-latency`` per call and answers a fraction of
+calls with HTTP 429; a fake upsert sleeps ``--upsert-latency``. Peak memory
+is measured with ``tracemalloc``. Run from the repository root:
+
+    python -m benchmarks.ingest_benchmark --chunks 5000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import time
+import tracemalloc
+
+from src.functions.crawl.chunk import Chunk
+from src.functions.vector.embedding import MAX_DOCUMENTS, LocalEmbedder
+from src.functions.vector.ingest import IngestConfig, IngestPipeline
+
+
+class RateLimited(Exception):
+    status = 429
+    headers = {"retry-after": "0.05"}
+
+
+class FakeBackend:
+    def __init__(self, embed_latency, upsert_latency, rate_limit_ratio, dimension):
+        self.embed_latency = embed_latency
+        self.upsert_latency = upsert_latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.embedder = LocalEmbedder(dimension)
+        self.upserted = 0
+
+    def embed(self, texts):
+        time.sleep(self.embed_latency)
+        if random.random() < self.rate_limit_ratio:
+            raise RateLimited("429 Too Many Requests")
+        return self.embedder.embed(texts, "passage")
+
+    def upsert(self, chunks, vectors):
+        time.sleep(self.upsert_latency)
+        self.upserted += len(chunks)
+
+
+def make_chunk(i: int) -> Chunk:
+    text = f"Program {i} helps households with income below the guideline. " * 4
+    return Chunk(
+        text=text, source_url=f"http://example.gov/{i}", start=0, end=len(text), token_count=40
+    )
+
+
+def run_sequential(backend, count):
+    # Previous behaviour: embed every batch in turn, then one upsert of everything
+    chunks = [make_chunk(i) for i in range(count)]
+    vectors = []
+    for i in range(0, count, MAX_DOCUMENTS):
+        batch = [c.text for c in chunks[i : i + MAX_DOCUMENTS]]
+        while True:
+            try:
+                vectors.extend(backend.embed(batch))
+                break
+            except RateLimited:
+                time.sleep(0.05)
+    backend.upsert(chunks, vectors)
+
+
+async def run_pipeline(backend, count, concurrency):
+    config = IngestConfig(embed_concurrency=concurrency, base_delay=0.05)
+    async with IngestPipeline(backend.embed, backend.upsert, config) as pipeline:
+        for i in range(count):
+            await pipeline.put(make_chunk(i))
+    return pipeline.stats
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--upsert-latency", type=float, default=0.02)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.05)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    def backend():
+        return FakeBackend(
+            args.embed_latency, args.upsert_latency, args.rate_limit_ratio, args.dimension
+        )
+
+    _, elapsed, peak = measure(lambda: run_sequential(backend(), args.chunks))
+    print(f"sequential  time={elapsed:6.2f}s  peak={peak:7.1f} MiB")
+    stats, elapsed, peak = measure(
+        lambda: asyncio.run(run_pipeline(backend(), args.chunks, args.concurrency))
+    )
+    print(f"pipelined   time={elapsed:6.2f}s  peak={peak:7.1f} MiB  {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+LLM call throughput against concurrency, with and without adaptive limiting.
+
+Starts a fake OpenAI-compatible chat completions server that takes
+``--latency`` seconds per completion and serves at most ``--capacity``
+requests at once, answering the rest with HTTP 429 and a ``Retry-After``.
+``chat_completion`` then sends ``--calls`` requests through the shared
+client code at each fixed concurrency, and once more in adaptive mode
+starting from the highest one. Run from the repository root:
+
+    python -m benchmarks.llm_benchmark --calls 200 --capacity 8
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from together import AsyncTogether
+
+from src.functions.llm.client import AdaptiveLimiter, chat_completion
+
+
+@contextmanager
+def serve_llm(latency: float, capacity: int, retry_after: float = 0.2):
+    """Yield the base URL of a running fake chat completions server."""
+    slots = threading.BoundedSemaphore(capacity)
+    stats = {"completions": 0, "rejected": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if not slots.acquire(blocking=False):
+                stats["rejected"] += 1
+                self.reply(429, {"error": {"message": "rate limited"}})
+                return
+            try:
+                time.sleep(latency)
+                stats["completions"] += 1
+            finally:
+                slots.release()
+            self.reply(
+                200,
+                {
+                    "id": "fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "- SNAP"},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                },
+            )
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", str(retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1", stats
+    finally:
+        server.shutdown()
+
+
+async def run(base_url, calls, limiter):
+    client = AsyncTogether(api_key="fake", base_url=base_url, max_retries=0)
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(chat_completion("system", f"prompt {i}", client, limiter) for i in range(calls))
+    )
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--capacity", type=int, default=8)
+    args = parser.parse_args()
+
+    levels = [1, 2, 4, 8, 16, 32]
+    with serve_llm(args.latency, args.capacity) as (base_url, stats):
+        for label, concurrency, adaptive in [("fixed   ", n, False) for n in levels] + [
+            ("adaptive", levels[-1], True)
+        ]:
+            limiter = AdaptiveLimiter(concurrency, adaptive=adaptive, base_delay=0.1)
+            stats["rejected"] = 0
+            throughput = asyncio.run(run(base_url, args.calls, limiter))
+            print(
+                f"{label} concurrency={concurrency:3d}  {throughput:6.1f} calls/s"
+                f"  429s={stats['rejected']:4d}  final limit={limiter.limit:5.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
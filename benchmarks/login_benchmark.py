@@ -0,0 +1,216 @@
+"""
+Logins per second through ``/auth`` with and without cached Google certificates.
+
+``GoogleKeyPair`` is a local stand-in for Google's signing keys: an RSA key
+pair with a self-signed certificate that signs ID tokens, and
+``serve_google_certs`` publishes its certificates like
+``https://www.googleapis.com/oauth2/v1/certs`` does, with ``Cache-Control:
+max-age`` and ``--latency`` seconds of delay per fetch. ``--logins`` logins
+are sent to ``/auth``, ``--concurrency`` at a time, first verifying with
+``id_token.verify_token`` and a fresh transport per login (what ``/auth``
+used to do), then with ``GoogleTokenVerifier``. A rotated key is checked at
+the end. Run from the repository root:
+
+    python -m benchmarks.login_benchmark --logins 300 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The backend opens its database on import; point it at a scratch file
+WORKDIR = tempfile.mkdtemp(prefix="login-bench-")
+os.chdir(WORKDIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+CLIENT_ID = "bench-client.apps.googleusercontent.com"
+os.environ["GOOGLE_CLIENT_ID"] = CLIENT_ID
+
+import httpx  # noqa: E402
+from cryptography import x509  # noqa: E402
+from cryptography.hazmat.primitives import hashes, serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from cryptography.x509.oid import NameOID  # noqa: E402
+from google.auth import crypt, jwt  # noqa: E402
+from google.auth.transport import requests as google_requests  # noqa: E402
+from google.oauth2 import id_token  # noqa: E402
+
+from src.backend import app as backend  # noqa: E402
+from src.backend.google_tokens import GoogleTokenVerifier  # noqa: E402
+
+
+class GoogleKeyPair:
+    """An RSA signing key and its self-signed certificate."""
+
+    def __init__(self):
+        self.key_id = uuid.uuid4().hex
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, self.key_id)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        self.certificate = cert.public_bytes(serialization.Encoding.PEM).decode()
+        private_key = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        self.signer = crypt.RSASigner.from_string(private_key, key_id=self.key_id)
+
+    def id_token(self, email: str, audience: str = CLIENT_ID, **claims) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": audience,
+            "sub": email,
+            "email": email,
+            "name": email.split("@")[0],
+            "iat": now,
+            "exp": now + 3600,
+            **claims,
+        }
+        return jwt.encode(self.signer, payload).decode()
+
+
+@contextmanager
+def serve_google_certs(keys, latency: float, max_age: int = 20000):
+    """Yield the URL of a certificate endpoint for ``keys`` and its counters.
+
+    ``keys`` is a list the caller may change to rotate keys.
+    """
+    stats = {"fetches": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            with lock:
+                stats["fetches"] += 1
+            body = json.dumps({key.key_id: key.certificate for key in keys}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header(
+                "Cache-Control", f"public, max-age={max_age}, must-revalidate"
+            )
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/oauth2/v1/certs", stats
+    finally:
+        server.shutdown()
+
+
+class FetchPerLogin:
+    """How /auth verified tokens before: fetch the certificates every time."""
+
+    def __init__(self, certs_url: str):
+        self.certs_url = certs_url
+
+    async def verify(self, token: str):
+        return id_token.verify_token(
+            token, google_requests.Request(), CLIENT_ID, certs_url=self.certs_url
+        )
+
+    async def aclose(self):
+        pass
+
+
+async def login_storm(verifier, tokens, concurrency: int) -> float:
+    backend.token_verifier = verifier
+    slots = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def login(token):
+            async with slots:
+                response = await client.post("/auth", json={"token": token})
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+    # As at app shutdown; the pooled connections belong to this event loop
+    await verifier.aclose()
+    await backend.async_engine.dispose()
+    return elapsed
+
+
+async def check_rotation(keys, certs_url: str, email: str):
+    """Tokens from a newly published key verify; others are rejected."""
+    verifier = GoogleTokenVerifier(CLIENT_ID, certs_url, min_refetch=0)
+    await verifier.verify(keys[0].id_token(email))
+    rotated = GoogleKeyPair()
+    keys.append(rotated)
+    await verifier.verify(rotated.id_token(email))
+    rejected = [
+        GoogleKeyPair().id_token(email),
+        keys[0].id_token(email, audience="another-client"),
+        keys[0].id_token(email, iss="https://accounts.example.com"),
+    ]
+    for token in rejected:
+        try:
+            await verifier.verify(token)
+        except ValueError:
+            continue
+        raise AssertionError("an invalid token was accepted")
+    await verifier.aclose()
+    return verifier.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    keys = [GoogleKeyPair()]
+    emails = [f"user{i}@example.gov" for i in range(args.logins)]
+    tokens = [keys[0].id_token(email) for email in emails]
+
+    with serve_google_certs(keys, args.latency) as (certs_url, server_stats):
+        # Create the users first so both runs do the same database work
+        verifier = GoogleTokenVerifier(CLIENT_ID, certs_url)
+        asyncio.run(login_storm(verifier, tokens, args.concurrency))
+
+        runs = [
+            ("fetch per login", FetchPerLogin(certs_url)),
+            ("cached certs", GoogleTokenVerifier(CLIENT_ID, certs_url)),
+        ]
+        for label, verifier in runs:
+            fetches = server_stats["fetches"]
+            elapsed = asyncio.run(login_storm(verifier, tokens, args.concurrency))
+            print(
+                f"{label:<16} {args.logins / elapsed:8.1f} logins/s  "
+                f"cert fetches={server_stats['fetches'] - fetches}"
+            )
+
+        stats = asyncio.run(check_rotation(keys, certs_url, emails[0]))
+        print(f"rotation check   {stats}")
+
+
+if __name__ == "__main__":
+    main()
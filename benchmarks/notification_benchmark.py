@@ -0,0 +1,158 @@
+"""
+Notification throughput against a fake MailerSend API.
+
+Starts a local server implementing ``POST /v1/email``,
+``POST /v1/bulk-email`` and ``GET /v1/bulk-email/{id}`` (every bulk job is
+completed by the time its status is asked for). A send takes ``--latency``
+seconds, and at most ``--capacity`` sends are served at once; the rest are
+answered with HTTP 429 and a ``Retry-After``. ``--messages`` notifications are then sent
+one request at a time (the old path), with concurrent single sends, and
+with bulk requests; a last row repeats the bulk run, whose idempotency
+keys are all in the ledger already. Run from the repository root:
+
+    python -m benchmarks.notification_benchmark --messages 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from src.functions.sendNotification.dispatcher import (
+    Notification,
+    NotificationConfig,
+    NotificationDispatcher,
+    NotificationLedger,
+)
+
+
+@contextmanager
+def serve_mailersend(latency: float, capacity: int, retry_after: float = 0.2):
+    """Yield the base URL of a running fake MailerSend API and its counters."""
+    slots = threading.BoundedSemaphore(capacity)
+    stats = {"messages": 0, "rejected": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if not slots.acquire(blocking=False):
+                with lock:
+                    stats["rejected"] += 1
+                self.reply(429, {"message": "Too Many Attempts."})
+                return
+            try:
+                time.sleep(latency)
+                with lock:
+                    stats["messages"] += len(body) if isinstance(body, list) else 1
+            finally:
+                slots.release()
+            if self.path.endswith("/bulk-email"):
+                bulk_email_id = uuid.uuid4().hex
+                self.reply(202, {"message": "queued", "bulk_email_id": bulk_email_id})
+            else:
+                self.reply(202, None)
+
+        def do_GET(self):
+            bulk_email_id = self.path.rsplit("/", 1)[-1]
+            data = {
+                "id": bulk_email_id,
+                "state": "completed",
+                "validation_errors": None,
+                "suppressed_recipients": None,
+            }
+            self.reply(200, {"data": data})
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            if payload is not None:
+                self.send_header("Content-Type", "application/json")
+            if status == 429:
+                self.send_header("Retry-After", str(retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1", stats
+    finally:
+        server.shutdown()
+
+
+def notifications(count: int, run: str):
+    return [
+        Notification(
+            to_email=f"user{i}@example.com",
+            to_name=f"User {i}",
+            subject="Grant deadlines this week",
+            html_content=f"<p>Digest {run}</p>",
+            text_content=f"Digest {run}",
+        )
+        for i in range(count)
+    ]
+
+
+async def run(base_url, messages, config, ledger):
+    client = httpx.AsyncClient(base_url=base_url, timeout=config.timeout)
+    started = time.perf_counter()
+    async with NotificationDispatcher(config, client, ledger) as dispatcher:
+        for notification in messages:
+            await dispatcher.put(notification)
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    return dispatcher.stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = [
+        ("serial", "serial", 1, 1),
+        ("concurrent", "concurrent", args.concurrency, 1),
+        ("bulk", "bulk", args.concurrency, args.batch_size),
+        ("bulk again", "bulk", args.concurrency, args.batch_size),
+    ]
+    with tempfile.TemporaryDirectory() as tmp, serve_mailersend(
+        args.latency, args.capacity
+    ) as (base_url, server_stats):
+        ledger = NotificationLedger(os.path.join(tmp, "ledger.db"))
+        for label, run_name, concurrency, batch_size in rows:
+            # The serial baseline would take minutes at full size
+            count = min(args.messages, 200) if label == "serial" else args.messages
+            config = NotificationConfig(
+                concurrency=concurrency, batch_size=batch_size, base_delay=0.1
+            )
+            stats, elapsed = asyncio.run(
+                run(base_url, notifications(count, run_name), config, ledger)
+            )
+            print(
+                f"{label:<11} messages={count:<5} {stats.sent / elapsed:8.1f} msgs/s  "
+                f"sent={stats.sent:<5} duplicates={stats.duplicates:<5} "
+                f"requests={stats.requests:<5} retries={stats.retries}"
+            )
+        ledger.close()
+
+
+if __name__ == "__main__":
+    main()
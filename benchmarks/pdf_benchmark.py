@@ -0,0 +1,142 @@
+"""
+PDF parsing throughput of the crawler's parse stage.
+
+Serves an index page linking to ``--pdfs`` small PDFs (``--unique`` distinct
+files, the rest repeats under other URLs, as forms often are) and crawls it
+with a ``PdfParser`` whose backend is pypdf plus ``--parse-latency`` seconds
+to stand in for a LlamaParse round trip. Rows: one parse worker, a pool of
+``--workers``, and a second crawl that finds every PDF in the parse cache.
+Run from the repository root:
+
+    python -m benchmarks.pdf_benchmark --pdfs 60 --unique 40 --workers 8
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.functions.crawl.engine import CrawlConfig, Crawler
+from src.functions.crawl.pdf import PdfCache, PdfParser, parse_with_pypdf
+
+
+def make_pdf(text: str) -> bytes:
+    """A one-page PDF showing ``text`` in Helvetica."""
+    stream = b"BT /F1 12 Tf 72 720 Td (%s) Tj ET" % text.encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return out
+
+
+@contextmanager
+def serve_pdfs(pdfs: int, unique: int):
+    """Yield the base URL of a site whose index links to ``pdfs`` PDFs."""
+    documents = [make_pdf(f"Benefit form {i % unique}") for i in range(pdfs)]
+    index = "".join(f'<a href="/forms/{i}.pdf">Form {i}</a>' for i in range(pdfs))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/forms/"):
+                body = documents[int(self.path[len("/forms/") : -len(".pdf")])]
+                content_type = "application/pdf"
+            else:
+                body = f"<html><title>Forms</title><body>{index}</body></html>".encode()
+                content_type = "text/html"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+
+
+def slow_backend(latency: float):
+    def parse(path: str) -> str:
+        time.sleep(latency)
+        return parse_with_pypdf(path)
+
+    return parse
+
+
+async def run_crawl(base_url: str, parser: PdfParser):
+    config = CrawlConfig(
+        max_depth=1,
+        max_pages=10_000,
+        concurrency=16,
+        per_host_concurrency=16,
+        politeness_delay=0.0,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        pages = await Crawler(config, pdf_parser=parser).crawl([base_url])
+        elapsed = time.perf_counter() - start
+    return pages, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdfs", type=int, default=60)
+    parser.add_argument("--unique", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--parse-latency", type=float, default=0.25)
+    args = parser.parse_args()
+
+    backend = slow_backend(args.parse_latency)
+    with tempfile.TemporaryDirectory() as tmp, serve_pdfs(
+        args.pdfs, args.unique
+    ) as base_url:
+        rows = [
+            ("1 worker", 1, os.path.join(tmp, "serial.db")),
+            (f"{args.workers} workers", args.workers, os.path.join(tmp, "pool.db")),
+            ("cached", args.workers, os.path.join(tmp, "pool.db")),
+        ]
+        for label, workers, cache_path in rows:
+            pdf_parser = PdfParser(backend, workers=workers, cache=PdfCache(cache_path))
+            pages, elapsed = asyncio.run(run_crawl(base_url, pdf_parser))
+            pdf_pages = [page for page in pages if page.url.endswith(".pdf")]
+            with_text = sum(1 for page in pdf_pages if page.text)
+            stats = pdf_parser.stats
+            print(
+                f"{label:<10} pdfs={len(pdf_pages):<4} with_text={with_text:<4} "
+                f"time={elapsed:6.2f}s  parsed={stats.parsed:<4} "
+                f"cache_hits={stats.cache_hits:<4} failed={stats.failed}"
+            )
+            pdf_parser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Deadline reminder scheduling over a large scratch database.
+
+Seeds ``--applications`` applications (and a fifth as many grants and
+users, deadlines spread over the next year), then compares finding the
+reminders due in the next ``--horizon-hours`` by scanning every application
+against ``ReminderScheduler.load`` on the deadline index. The reminders
+found are then grouped per user and sent to the fake MailerSend API from
+``notification_benchmark``. Run from the repository root:
+
+    python -m benchmarks.reminder_benchmark --applications 200000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# The backend opens ./test.db on import; keep the benchmark's out of the repo
+WORKDIR = tempfile.mkdtemp(prefix="reminders-")
+os.chdir(WORKDIR)
+
+import httpx  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from benchmarks.notification_benchmark import serve_mailersend  # noqa: E402
+from src.backend import app as backend  # noqa: E402
+from src.backend.reminders import (  # noqa: E402
+    COMPLETED_STATUS,
+    REMINDER_DAYS,
+    ReminderScheduler,
+    send_time,
+)
+from src.functions.sendNotification.dispatcher import NotificationLedger  # noqa: E402
+
+
+def seed(applications: int):
+    users, grants = max(1, applications // 5), max(1, applications // 5)
+    today = date.today()
+    rng = random.Random(0)
+    with backend.engine.begin() as db:
+        db.execute(
+            insert(backend.User.__table__),
+            [
+                {"id": i, "email": f"user{i}@example.gov", "name": f"User {i}"}
+                for i in range(1, users + 1)
+            ],
+        )
+        db.execute(
+            insert(backend.Grant.__table__),
+            [
+                {
+                    "id": f"grant-{i}",
+                    "name": f"Grant {i}",
+                    "deadline": today + timedelta(days=rng.randrange(365)),
+                    "link": f"https://example.gov/grants/{i}",
+                    "user_id": rng.randrange(1, users + 1),
+                }
+                for i in range(grants)
+            ],
+        )
+        db.execute(
+            insert(backend.AppliedGrant.__table__),
+            [
+                {
+                    "id": f"application-{i}",
+                    "user_id": rng.randrange(1, users + 1),
+                    "grant_id": f"grant-{rng.randrange(grants)}",
+                    "status": rng.choice([10, 50, 90, COMPLETED_STATUS]),
+                    "current_status": "Application Submitted",
+                }
+                for i in range(applications)
+            ],
+        )
+
+
+def full_scan(start: datetime, end: datetime) -> int:
+    """What a poller without the index does: read every application."""
+    applied, grant = backend.AppliedGrant, backend.Grant
+    with backend.SessionLocal() as db:
+        rows = db.execute(
+            select(applied.user_id, applied.status, grant.deadline).join(
+                grant, grant.id == applied.grant_id
+            )
+        ).all()
+    return sum(
+        1
+        for _, status, deadline in rows
+        for days in REMINDER_DAYS
+        if status < COMPLETED_STATUS and start <= send_time(deadline, days) < end
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--applications", type=int, default=200_000)
+    parser.add_argument("--horizon-hours", type=float, default=1.0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed(args.applications)
+    elapsed = time.perf_counter() - started
+    print(f"seeded {args.applications} applications in {elapsed:.1f}s")
+
+    # Nine o'clock tomorrow, when that day's reminders fall due
+    tomorrow = date.today() + timedelta(days=1)
+    now = datetime(tomorrow.year, tomorrow.month, tomorrow.day, 9)
+    horizon = timedelta(hours=args.horizon_hours)
+
+    started = time.perf_counter()
+    scanned = full_scan(now - horizon, now + horizon)
+    elapsed = time.perf_counter() - started
+    print(f"full scan      {elapsed:6.3f}s  applicant reminders={scanned}")
+
+    async def run(base_url):
+        client = httpx.AsyncClient(base_url=base_url)
+        scheduler = ReminderScheduler(
+            horizon=horizon,
+            grace=horizon,
+            ledger=NotificationLedger(os.path.join(WORKDIR, "ledger.db")),
+            client=client,
+        )
+        await scheduler.load(now)
+        print(
+            f"indexed load   {scheduler.stats.load_seconds:6.3f}s  "
+            f"reminders={scheduler.stats.loaded} (owners included)"
+        )
+        started = time.perf_counter()
+        await scheduler.send(scheduler.pop_due(now + horizon))
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+        return scheduler.stats, elapsed
+
+    with serve_mailersend(latency=0.05, capacity=8) as (base_url, server_stats):
+        stats, elapsed = asyncio.run(run(base_url))
+    print(
+        f"send           {elapsed:6.3f}s  reminders={stats.sent} emails={stats.emails} "
+        f"messages received={server_stats['messages']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Dashboard polling of ``/applied-grants`` with and without the session user id.
+
+Seeds a scratch database with ``--users`` users and their applications, then
+polls ``/applied-grants`` with real signed session cookies, first through the
+old ``get_current_user`` (look the user up by the session's email on every
+request) and then through the current one (the id is read from the session).
+Reports the queries and latency per request; the current one still checks
+that each session's user exists, once per ``USER_CHECK_TTL``. Run from the
+repository root:
+
+    python -m benchmarks.session_benchmark --requests 2000
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# The backend opens its database on import; point it at a scratch file
+WORKDIR = tempfile.mkdtemp(prefix="session-bench-")
+os.chdir(WORKDIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+import httpx  # noqa: E402
+from fastapi import Depends, HTTPException, Request  # noqa: E402
+from itsdangerous import TimestampSigner  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from src.backend import app as backend  # noqa: E402
+
+SECRET_KEY = "mysecret"
+
+
+def session_cookie(user: dict) -> str:
+    """A cookie SessionMiddleware accepts, as /auth would have set it."""
+    payload = base64.b64encode(json.dumps({"user": user}).encode())
+    return TimestampSigner(SECRET_KEY).sign(payload).decode()
+
+
+async def lookup_by_email(request: Request, db: Session = Depends(backend.get_db)):
+    """``get_current_user`` as it was: one users query per request."""
+    user_info = request.session.get("user")
+    if not user_info:
+        raise HTTPException(status_code=401, detail="Invalid authentication")
+    user = (
+        db.query(backend.User)
+        .filter(backend.User.email == user_info["email"])
+        .first()
+    )
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+def seed(users: int, per_user: int):
+    rng = random.Random(0)
+    with backend.engine.begin() as db:
+        db.execute(
+            insert(backend.User.__table__),
+            [
+                {"id": i, "email": f"user{i}@example.gov", "name": f"User {i}"}
+                for i in range(1, users + 1)
+            ],
+        )
+        db.execute(
+            insert(backend.Grant.__table__),
+            [{"id": f"grant-{i}", "name": f"Grant {i}"} for i in range(100)],
+        )
+        db.execute(
+            insert(backend.AppliedGrant.__table__),
+            [
+                {
+                    "id": f"application-{i}-{j}",
+                    "user_id": i,
+                    "grant_id": f"grant-{rng.randrange(100)}",
+                    "status": 10,
+                    "current_status": "Application Submitted",
+                }
+                for i in range(1, users + 1)
+                for j in range(per_user)
+            ],
+        )
+
+
+class QueryCounter:
+    def __init__(self, *engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self.count_query)
+
+    def count_query(self, *args):
+        self.count += 1
+
+
+async def poll(cookies, requests: int, counter: QueryCounter):
+    timings = []
+    queries = counter.count
+    transport = httpx.ASGITransport(app=backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for i in range(requests):
+            client.cookies.set("session", cookies[i % len(cookies)])
+            started = time.perf_counter()
+            response = await client.get("/applied-grants")
+            timings.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+    return timings, (counter.count - queries) / requests
+
+
+def report(label: str, timings, queries: float):
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{label:<14} queries/request={queries:4.2f}  "
+        f"p50={statistics.median(timings):6.2f}ms  p95={p95:6.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--applications-per-user", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    seed(args.users, args.applications_per_user)
+    counter = QueryCounter(backend.engine, backend.async_engine.sync_engine)
+    users = [
+        {"id": i, "email": f"user{i}@example.gov", "name": f"User {i}"}
+        for i in range(1, args.users + 1)
+    ]
+
+    # Sessions from before the id was stored only carry the email
+    old_cookies = [
+        session_cookie({"email": u["email"], "name": u["name"]}) for u in users
+    ]
+    backend.app.dependency_overrides[backend.get_current_user] = lookup_by_email
+    report("email lookup", *asyncio.run(poll(old_cookies, args.requests, counter)))
+    backend.app.dependency_overrides.clear()
+
+    cookies = [session_cookie(u) for u in users]
+    report("session id", *asyncio.run(poll(cookies, args.requests, counter)))
+
+    print(f"known users: {backend.known_users.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Synthetic local website used by the crawl benchmarks.
+
+``serve_site`` starts a threaded HTTP server on a free port that serves a tree
+of ``pages`` HTML pages, each linking to ``fanout`` children, with an optional
+artificial per-request latency to mimic a remote government site. Responses
+carry an ETag and honour ``If-None-Match`` so incremental recrawls can be
+measured.
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def render_page(page_id: int, pages: int, fanout: int) -> bytes:
+    children = [
+        page_id * fanout + i
+        for i in range(1, fanout + 1)
+        if page_id * fanout + i < pages
+    ]
+    links = "".join(f'<li><a href="/page/{c}">Page {c}</a></li>' for c in children)
+    body = (
+        "<html><head><title>Benefit page {id}</title></head><body>"
+        "<nav><a href='/'>Home</a> | <a href='#main'>Skip</a></nav>"
+        "<h1>Benefit program {id}</h1>"
+        "<p>Program {id} offers assistance to eligible households.</p>"
+        "<p>Applicants must provide proof of income and residency.</p>"
+        "<ul>{links}</ul>"
+        "<footer>An official website of the United States government</footer>"
+        "</body></html>"
+    ).format(id=page_id, links=links)
+    return body.encode()
+
+
+@contextmanager
+def serve_site(pages: int = 200, fanout: int = 4, latency: float = 0.0):
+    """Yield the base URL of a running synthetic site."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            path = self.path.rstrip("/")
+            page_id = 0 if path == "" else int(path.rsplit("/", 1)[-1])
+            if page_id >= pages:
+                self.send_error(404)
+                return
+            body = render_page(page_id, pages, fanout)
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/"
+    finally:
+        server.shutdown()
+        server.server_close()
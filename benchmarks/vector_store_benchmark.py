@@ -0,0 +1,90 @@
+"""
+Query latency of the local vector store: exact, batched and IVF.
+
+Fills a temporary store with random unit vectors and reports per-query
+latency for single exact queries, batched exact queries and approximate IVF
+queries, with the IVF recall@k against exact search. Run from the
+repository root:
+
+    python -m benchmarks.vector_store_benchmark --vectors 100000
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from src.functions.vector.store import LocalVectorStore
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    result = None
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=15)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Clustered data, closer to real embeddings than uniform noise
+    centers = rng.normal(size=(64, args.dimension)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp, dimension=args.dimension)
+        start = time.perf_counter()
+        for i in range(0, args.vectors, 5000):
+            n = min(5000, args.vectors - i)
+            data = centers[rng.integers(0, 64, n)] + rng.normal(
+                scale=0.5, size=(n, args.dimension)
+            ).astype(np.float32)
+            store.upsert(
+                [
+                    {"id": f"v{i + j}", "values": data[j], "metadata": {"text": str(i + j)}}
+                    for j in range(n)
+                ],
+                "ns1",
+            )
+        print(f"loaded {args.vectors} vectors in {time.perf_counter() - start:.1f}s")
+
+        queries = (
+            centers[rng.integers(0, 64, args.queries)]
+            + rng.normal(scale=0.5, size=(args.queries, args.dimension))
+        ).tolist()
+        exact, single_ms = timed(
+            lambda: [store.query(q, args.top_k, "ns1") for q in queries], 1
+        )
+        _, batch_ms = timed(lambda: store.query_many(queries, args.top_k, "ns1"), 1)
+        print(f"exact single   {single_ms / args.queries:8.2f} ms/query")
+        print(f"exact batched  {batch_ms / args.queries:8.2f} ms/query")
+
+        approx_store = LocalVectorStore(
+            tmp, approximate=True, nprobe=args.nprobe, ivf_min_rows=0
+        )
+        _, build_ms = timed(lambda: approx_store.build_ivf("ns1"), 1)
+        approx, ivf_ms = timed(
+            lambda: [approx_store.query(q, args.top_k, "ns1") for q in queries], 1
+        )
+        recall = np.mean(
+            [
+                len({m["id"] for m in a["matches"]} & {m["id"] for m in e["matches"]})
+                / args.top_k
+                for a, e in zip(approx, exact)
+            ]
+        )
+        print(
+            f"ivf            {ivf_ms / args.queries:8.2f} ms/query  "
+            f"recall@{args.top_k}={recall:.3f}  build={build_ms / 1000:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,68 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Date, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
-from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import asyncio
+import json
 import uuid
 import os
 from dotenv import load_dotenv
 from datetime import date, datetime
-from together import Together
 
-# Import for Google OAuth verification
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-
-from src.functions.crawl.web import get_matching_embedding, initialize_pinecone_index
+from src.backend.batch import recommend_users
+from src.backend.clients import Clients
+from src.backend.database import (
+    DB_AUTO_MIGRATE,
+    AsyncSessionLocal,
+    Base,
+    SessionLocal,
+    async_engine,
+    engine,
+)
+from src.backend.google_tokens import GoogleTokenVerifier
+from src.backend.grants import (
+    GRANTS_MODEL,
+    grants_messages,
+    grants_query,
+    grants_user_info,
+)
+from src.backend.identity import CurrentUser, KnownUsers
+from src.backend.migrations import migrate
+from src.backend.models import AppliedGrant, Grant, Recommendation, User
+from src.backend.recommendations import profile_key
+from src.backend.timing import RequestTimer
+from src.functions.crawl.web import get_matching_embedding
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the Pinecone and Together clients once and share them
+    app.state.clients = Clients()
+    # Have Google's certificates cached before the first login
+    token_verifier.refresh()
+    yield
+    app.state.clients = None
+    await token_verifier.aclose()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Debugging: Print GOOGLE_CLIENT_ID to ensure it's loaded correctly
 print(f"GOOGLE_CLIENT_ID: {os.getenv('GOOGLE_CLIENT_ID')}")
 
+# Verifies Google ID tokens for /auth; certificates are cached between logins
+token_verifier = GoogleTokenVerifier(audience=os.getenv("GOOGLE_CLIENT_ID"))
+
 # Enable CORS for frontend-backend communication
 app.add_middleware(
     CORSMiddleware,
@@ -43,51 +80,9 @@ app.add_middleware(
     https_only=False,  # Set to True in production
 )
 
-# Database setup
-DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-
-# Database Models
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
-    name = Column(String)
-    occupation = Column(String, nullable=True)
-    income = Column(String, nullable=True)
-    demographics = Column(String, nullable=True)
-    affiliated_organization = Column(String, nullable=True)
-    birthdate = Column(Date, nullable=True)
-
-
-class Grant(Base):
-    __tablename__ = "grants"
-    id = Column(String, primary_key=True, index=True)
-    name = Column(String)
-    deadline = Column(Date)
-    documents_needed = Column(String)
-    steps_to_apply = Column(String)
-    link = Column(String)
-    user_id = Column(
-        Integer, ForeignKey("users.id")
-    )  # Associate grants with a specific user
-    user = relationship("User")  # Define relationship with User
-
-
-class AppliedGrant(Base):
-    __tablename__ = "applied_grants"
-    id = Column(String, primary_key=True, index=True)
-    user_id = Column(Integer)
-    grant_id = Column(String)
-    status = Column(Integer)
-    current_status = Column(String)
-
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables, and add indexes and foreign keys missing from older databases
+if DB_AUTO_MIGRATE:
+    migrate(engine, Base.metadata)
 
 
 # Dependency to get the database session
@@ -99,6 +94,26 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency to get the shared Pinecone/Together clients
+def get_clients(request: Request) -> Clients:
+    return request.app.state.clients
+
+
+# Users allowed to call admin endpoints such as /grants/batch
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
+# Larger jobs belong in the offline batch job, not in one request
+BATCH_GRANTS_MAX_EMAILS = int(os.getenv("BATCH_GRANTS_MAX_EMAILS", "500"))
+
+
 # Data Models
 class ApplyGrantRequest(BaseModel):
     grant_id: str
@@ -135,9 +150,15 @@ class EmailRequest(BaseModel):
     email: str
 
 
+class BatchGrantsRequest(BaseModel):
+    emails: List[str] = Field(
+        max_length=BATCH_GRANTS_MAX_EMAILS, description="Users to recommend for"
+    )
+
+
 # Authentication Endpoint
 @app.post("/auth")
-async def auth(request: Request, db: Session = Depends(get_db)):
+async def auth(request: Request, db: AsyncSession = Depends(get_async_db)):
     data = await request.json()
     token = data.get("token")
     if not token:
@@ -145,24 +166,26 @@ async def auth(request: Request, db: Session = Depends(get_db)):
     try:
         print(f"Received Token: {token}")  # Debugging line
 
-        # Verify the token with Google's OAuth2 API
-        id_info = id_token.verify_oauth2_token(
-            token, google_requests.Request(), os.getenv("GOOGLE_CLIENT_ID")
-        )
+        # Verify the token against Google's cached certificates
+        id_info = await token_verifier.verify(token)
         print(f"ID Info: {id_info}")  # Debugging line
 
         # Extract user info
         user_email = id_info["email"]
         user_name = id_info.get("name", "")
         # Check if user exists in DB
-        user = db.query(User).filter(User.email == user_email).first()
+        result = await db.execute(select(User).where(User.email == user_email))
+        user = result.scalars().first()
         if not user:
             user = User(email=user_email, name=user_name)
             db.add(user)
-            db.commit()
-            db.refresh(user)
-        # Store user info in session
-        request.session["user"] = {"email": user_email, "name": user_name}
+            await db.commit()
+        # Store user info in session; get_current_user reads it from there
+        request.session["user"] = {
+            "id": user.id,
+            "email": user_email,
+            "name": user_name,
+        }
         return {
             "message": "Login successful",
             "user": {"email": user_email, "name": user_name},
@@ -175,17 +198,48 @@ async def auth(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# Users whose session was checked against the users table recently
+known_users = KnownUsers()
+
+
 # Dependency to get the current user
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
+async def get_current_user(request: Request) -> CurrentUser:
     user_info = request.session.get("user")
     if not user_info:
         raise HTTPException(
             status_code=401, detail="Invalid authentication credentials"
         )
-    user = db.query(User).filter(User.email == user_info["email"]).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+    if "id" not in user_info:
+        # Sessions issued before the id was stored: look it up once
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(User).where(User.email == user_info["email"])
+            )
+            user = result.scalars().first()
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        user_info = {"id": user.id, "email": user.email, "name": user.name or ""}
+        request.session["user"] = user_info
+        known_users.add(user.id)
+    current_user = CurrentUser(**user_info)
+    if current_user.id not in known_users:
+        # The cookie may outlive the user it was issued for
+        async with AsyncSessionLocal() as db:
+            user_id = await db.scalar(select(User.id).where(User.id == current_user.id))
+        if user_id is None:
+            request.session.pop("user", None)
+            raise HTTPException(status_code=401, detail="User not found")
+        known_users.add(current_user.id)
+    return current_user
+
+
+# Dependency for endpoints only administrators may call
+async def get_admin_user(
+    current_user: CurrentUser = Depends(get_current_user),
+) -> CurrentUser:
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
 
 
 # Logout Endpoint
@@ -195,63 +249,174 @@ async def logout(request: Request):
     return {"message": "Logged out successfully"}
 
 
+async def find_user_by_email(db: AsyncSession, email: str, timer: RequestTimer):
+    with timer.step("db"):
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+    # Hand the connection back to the pool before the slow retrieval/LLM calls
+    await db.close()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found.")
+    return user
+
+
+async def build_grants_messages(user: User, clients: Clients, timer: RequestTimer):
+    query = grants_query(grants_user_info(user))
+
+    # The Pinecone SDK is sync; run it off the event loop
+    with timer.step("retrieve"):
+        results = await asyncio.to_thread(
+            get_matching_embedding, clients.pc, query, clients.vector_store
+        )
+    return grants_messages(user, results["matches"])
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
 # Grants Endpoint (for user-specific grants)
 @app.post("/grants")
-def get_grants(request: EmailRequest, db: Session = Depends(get_db)):
-    current_user = db.query(User).filter(User.email == request.email).first()
-    if current_user:
-        user_info = f"""# USER INFO
-        - Occupation: {current_user.occupation}
-        - Income: {current_user.income}
-        - Demographics: {current_user.demographics}
-        - Affiliated Organization: {current_user.affiliated_organization}
-        - Birthdate: {current_user.birthdate}
-        """
-
-        query = f"""What kind of benefits government offers to citizen having:
-        {user_info}
-        """
-
-        pc = initialize_pinecone_index()
-        results = get_matching_embedding(pc, query)
-
-        prompt_with_relevant_data = f"""# RELEVANT KNOWLEDGE\n\n
-        {"\n".join([match['metadata']['text'] for match in results["matches"]])}
-        """
-
-        prompt = f"""
-        Tell user what kind of benefit they will have based on their information, relevant knowledge and your knowledge:
-        {prompt_with_relevant_data}
-        {user_info}
-        Answer in bulleted points, and provide a link to the relevant government website.
-        """
-
-        client = Together()
-
-        completion = client.chat.completions.create(
-            model="meta-llama/Llama-3.2-3B-Instruct-Turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Provide clear, accessible information to help underprivileged citizens understand the government benefits they may qualify for. Present details on financial aid, healthcare, food assistance, housing, education, and disability support. Keep the information simple, organized, and free of jargon. Include eligibility criteria, application steps, and common documentation needed. Address any barriers, like language, digital literacy, and complex processes, with straightforward guidance.",
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                },
-            ],
+async def get_grants(
+    request: EmailRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    clients: Clients = Depends(get_clients),
+):
+    timer = RequestTimer()
+    current_user = await find_user_by_email(db, request.email, timer)
+    cache_key = profile_key(current_user, clients.index_version.current())
+    with timer.step("cache"):
+        cached = clients.recommendations.get(cache_key)
+    if cached is not None:
+        response.headers["Server-Timing"] = timer.server_timing()
+        timer.log("/grants cached")
+        return {"content": cached}
+
+    messages = await build_grants_messages(current_user, clients, timer)
+    with timer.step("llm_queue"):
+        await clients.llm_slots.acquire()
+    try:
+        with timer.step("llm"):
+            completion = await clients.llm.chat.completions.create(
+                model=GRANTS_MODEL, messages=messages
+            )
+    finally:
+        clients.llm_slots.release()
+
+    content = completion.choices[0].message.content
+    clients.recommendations.put(cache_key, content)
+    response.headers["Server-Timing"] = timer.server_timing()
+    timer.log("/grants")
+    return {"content": content}
+
+
+# Streaming variant of /grants: Server-Sent Events with one token per event
+@app.post("/grants/stream")
+async def stream_grants(
+    request: EmailRequest,
+    db: AsyncSession = Depends(get_async_db),
+    clients: Clients = Depends(get_clients),
+):
+    timer = RequestTimer()
+    current_user = await find_user_by_email(db, request.email, timer)
+    cache_key = profile_key(current_user, clients.index_version.current())
+    with timer.step("cache"):
+        cached = clients.recommendations.get(cache_key)
+
+    async def cached_events():
+        timer.mark("ttft")
+        yield sse_event({"token": cached})
+        timer.log("/grants/stream cached")
+        yield sse_event(
+            {"ttft_ms": timer.steps["ttft"], "total_ms": timer.total}, event="done"
         )
 
-        return {"content": completion.choices[0].message.content}
-    else:
-        raise HTTPException(status_code=404, detail="User not found.")
+    async def events():
+        tokens = []
+        with timer.step("llm_queue"):
+            await clients.llm_slots.acquire()
+        try:
+            stream = await clients.llm.chat.completions.create(
+                model=GRANTS_MODEL, messages=messages, stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    timer.mark("ttft")
+                    tokens.append(token)
+                    yield sse_event({"token": token})
+        except Exception as e:
+            print(f"Streaming /grants failed: {e}")
+            yield sse_event({"detail": "Generation failed"}, event="error")
+            return
+        finally:
+            clients.llm_slots.release()
+        if tokens:
+            clients.recommendations.put(cache_key, "".join(tokens))
+        timer.log("/grants/stream")
+        yield sse_event(
+            {"ttft_ms": timer.steps.get("ttft"), "total_ms": timer.total},
+            event="done",
+        )
+
+    if cached is None:
+        messages = await build_grants_messages(current_user, clients, timer)
+
+    # Headers go out before the first token, so they only carry db/retrieve
+    return StreamingResponse(
+        events() if cached is None else cached_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Server-Timing": timer.server_timing(),
+        },
+    )
+
+
+# Batch Grants Endpoint: recommendations for many users in one call
+@app.post("/grants/batch")
+async def batch_grants(
+    request: BatchGrantsRequest,
+    admin: CurrentUser = Depends(get_admin_user),
+    clients: Clients = Depends(get_clients),
+):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email.in_(request.emails)))
+        users = list(result.scalars())
+    contents, stats = await recommend_users(users, clients)
+    return {
+        "results": [
+            {"email": user.email, "content": contents.get(user.id)} for user in users
+        ],
+        "stats": stats,
+    }
+
+
+# Stored recommendations, written by the batch job; never triggers generation
+@app.get("/recommendations")
+def get_recommendations(
+    current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    recommendation = (
+        db.query(Recommendation)
+        .filter(Recommendation.user_id == current_user.id)
+        .first()
+    )
+    if not recommendation:
+        raise HTTPException(status_code=404, detail="No recommendations yet.")
+    return recommendation
 
 
 # Apply Grant Endpoint
 @app.post("/apply-grant")
 def apply_grant(
     request: ApplyGrantRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     grant = db.query(Grant).filter(Grant.id == request.grant_id).first()
@@ -277,7 +442,7 @@ def apply_grant(
 # Get Applied Grants Endpoint
 @app.get("/applied-grants")
 def get_applied_grants(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)
 ):
     applied_grants = (
         db.query(AppliedGrant).filter(AppliedGrant.user_id == current_user.id).all()
@@ -289,7 +454,7 @@ def get_applied_grants(
 @app.put("/update-grant-status")
 def update_grant_status(
     request: UpdateGrantStatusRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     grant = (
@@ -327,7 +492,7 @@ def check_profile(request: EmailRequest, db: Session = Depends(get_db)):
 @app.post("/create-grant")
 def create_grant(
     request: CreateGrantRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     new_grant = Grant(
@@ -347,10 +512,18 @@ def create_grant(
 
 # Update User Profile Endpoint
 @app.post("/update-profile")
-def update_user_profile(request: UserProfileRequest, db: Session = Depends(get_db)):
+def update_user_profile(
+    request: UserProfileRequest,
+    db: Session = Depends(get_db),
+    clients: Clients = Depends(get_clients),
+):
     user = db.query(User).filter(User.email == request.email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
+    # Drop the answer cached for the profile being replaced
+    clients.recommendations.invalidate(
+        profile_key(user, clients.index_version.current())
+    )
     if request.occupation is not None:
         user.occupation = request.occupation
     if request.income is not None:
@@ -0,0 +1,177 @@
+"""
+Batch generation of ``/grants`` recommendations.
+
+``recommend_users`` does for a list of users what ``/grants`` does for one,
+with each stage batched: users with the same profile are generated once,
+cache lookups run first, the remaining profile queries are embedded in
+batches and retrieved with one ``query_many``, and the completions fan out
+concurrently under ``Clients.llm_slots``. Results land in the
+``recommendations`` table, which the dashboard reads through
+``GET /recommendations`` without triggering generation.
+
+``run_recommendations`` is the offline job: it pages through every user by
+id and prints throughput in users per minute.
+
+    poetry run recommendations --page-size 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from src.backend.clients import MAX_CONCURRENT_LLM_CALLS, Clients
+from src.backend.database import AsyncSessionLocal
+from src.backend.grants import (
+    GRANTS_MODEL,
+    grants_messages,
+    grants_query,
+    grants_user_info,
+)
+from src.backend.models import Recommendation, User
+from src.backend.recommendations import profile_key
+from src.functions.crawl.web import NAMESPACE, embedding_cache, get_embedder
+
+
+class BatchStats(BaseModel):
+    users: int = 0
+    # cached and generated count distinct profiles, failed counts users
+    profiles: int = 0
+    cached: int = 0
+    generated: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def users_per_minute(self) -> float:
+        return self.users / self.elapsed * 60 if self.elapsed else 0.0
+
+
+async def _complete(clients: Clients, messages: List[dict]) -> str:
+    async with clients.llm_slots:
+        completion = await clients.llm.chat.completions.create(
+            model=GRANTS_MODEL, messages=messages
+        )
+    return completion.choices[0].message.content
+
+
+async def recommend_users(
+    users: List[User], clients: Clients, stats: Optional[BatchStats] = None
+):
+    """Return ``({user_id: content}, stats)``; failed users are left out."""
+    stats = stats or BatchStats()
+    started = time.perf_counter()
+    index_version = clients.index_version.current()
+
+    # One generation per distinct profile
+    profiles: Dict[str, List[User]] = {}
+    for user in users:
+        profiles.setdefault(profile_key(user, index_version), []).append(user)
+    stats.users += len(users)
+    stats.profiles += len(profiles)
+
+    answers: Dict[str, str] = {}
+    for key in profiles:
+        content = clients.recommendations.get(key)
+        if content is not None:
+            answers[key] = content
+    stats.cached += len(answers)
+
+    pending = [key for key in profiles if key not in answers]
+    queries = [grants_query(grants_user_info(profiles[key][0])) for key in pending]
+    vectors = []
+    if queries:
+        vectors = await asyncio.to_thread(
+            embedding_cache.embed, get_embedder(clients.pc), queries, "query"
+        )
+    results = []
+    if vectors:
+        results = await asyncio.to_thread(
+            clients.vector_store.query_many, vectors, 15, NAMESPACE
+        )
+    completions = await asyncio.gather(
+        *(
+            _complete(clients, grants_messages(profiles[key][0], result["matches"]))
+            for key, result in zip(pending, results)
+        ),
+        return_exceptions=True,
+    )
+    for key, content in zip(pending, completions):
+        if isinstance(content, Exception):
+            print(f"Recommendation failed for {len(profiles[key])} users: {content}")
+            stats.failed += len(profiles[key])
+            continue
+        stats.generated += 1
+        answers[key] = content
+        clients.recommendations.put(key, content)
+
+    contents = {
+        user.id: answers[key]
+        for key, group in profiles.items()
+        if key in answers
+        for user in group
+    }
+    await store_recommendations(contents, index_version)
+    stats.elapsed += time.perf_counter() - started
+    return contents, stats
+
+
+async def store_recommendations(contents: Dict[int, str], index_version: int):
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        for user_id, content in contents.items():
+            await db.merge(
+                Recommendation(
+                    user_id=user_id,
+                    content=content,
+                    index_version=index_version,
+                    created_at=now,
+                )
+            )
+        await db.commit()
+
+
+async def run_batch(clients: Clients, page_size: int = 100) -> BatchStats:
+    stats = BatchStats()
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(User).where(User.id > last_id).order_by(User.id).limit(page_size)
+            )
+            users = list(result.scalars())
+        if not users:
+            return stats
+        last_id = users[-1].id
+        await recommend_users(users, clients, stats)
+        print(
+            f"{stats.users} users, {stats.generated} generated, {stats.cached} cached, "
+            f"{stats.failed} failed, {stats.users_per_minute:.0f} users/min"
+        )
+
+
+def run_recommendations():
+    parser = argparse.ArgumentParser(description="Precompute /grants recommendations")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_CONCURRENT_LLM_CALLS,
+        help="Concurrent LLM calls",
+    )
+    args = parser.parse_args()
+
+    async def main():
+        clients = Clients(max_concurrent_llm_calls=args.concurrency)
+        return await run_batch(clients, args.page_size)
+
+    stats = asyncio.run(main())
+    print(f"Done: {stats}, {stats.users_per_minute:.0f} users/min")
+
+
+if __name__ == "__main__":
+    run_recommendations()
@@ -0,0 +1,38 @@
+"""
+Application-lifetime clients for the backend.
+
+Created once in the FastAPI lifespan and shared by every request, so the
+Pinecone index is verified at startup instead of per request and the
+Pinecone and Together connection pools are reused. The Together client is
+async; ``llm_slots`` caps how many completions are in flight at once
+(``MAX_CONCURRENT_LLM_CALLS``), and requests over the cap wait their turn on
+the event loop instead of piling onto the provider. Generated
+recommendations are cached per profile and index version.
+"""
+
+import asyncio
+import os
+
+from together import AsyncTogether
+
+from src.backend.recommendations import RecommendationCache
+from src.functions.crawl.web import (
+    get_vector_store,
+    initialize_pinecone_index,
+    uses_pinecone,
+    wait_for_index,
+)
+from src.functions.vector.version import IndexVersion
+
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "16"))
+
+
+class Clients:
+    def __init__(self, max_concurrent_llm_calls: int = MAX_CONCURRENT_LLM_CALLS):
+        self.pc = initialize_pinecone_index() if uses_pinecone() else None
+        wait_for_index(self.pc)
+        self.vector_store = get_vector_store(self.pc)
+        self.llm = AsyncTogether()
+        self.llm_slots = asyncio.Semaphore(max_concurrent_llm_calls)
+        self.index_version = IndexVersion()
+        self.recommendations = RecommendationCache()
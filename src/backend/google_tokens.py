@@ -0,0 +1,157 @@
+"""
+Local verification of Google ID tokens for ``/auth``.
+
+``id_token.verify_oauth2_token`` downloads Google's signing certificates on
+every call, over a new connection. ``GoogleTokenVerifier`` keeps them for as
+long as the certificate endpoint's ``Cache-Control: max-age`` allows, fetches
+them on one pooled client and checks signatures locally. Certificates are
+refreshed in the background once they are within
+``GOOGLE_CERTS_REFRESH_MARGIN`` seconds of expiring, so a login only waits on
+the network for the first fetch, after the cache has fully expired, or when a
+token is signed by a key it has not seen yet (Google rotated its keys).
+Concurrent fetches are merged into one request.
+"""
+
+import asyncio
+import math
+import os
+import re
+import time
+from typing import Any, Mapping, Optional
+
+import httpx
+from google.auth import jwt
+from pydantic import BaseModel
+
+GOOGLE_CERTS_URL = os.getenv(
+    "GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs"
+)
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+GOOGLE_CERTS_REFRESH_MARGIN = float(os.getenv("GOOGLE_CERTS_REFRESH_MARGIN", "300"))
+# Used when the certificate response carries no max-age
+GOOGLE_CERTS_DEFAULT_TTL = float(os.getenv("GOOGLE_CERTS_DEFAULT_TTL", "3600"))
+# A token with an unknown key id forces a fetch at most this often
+GOOGLE_CERTS_MIN_REFETCH = float(os.getenv("GOOGLE_CERTS_MIN_REFETCH", "30"))
+GOOGLE_CLOCK_SKEW = int(os.getenv("GOOGLE_CLOCK_SKEW", "0"))
+
+
+def cache_lifetime(headers: httpx.Headers) -> float:
+    """Seconds the certificates may be used for, from Cache-Control and Age."""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0.0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if not match:
+        return GOOGLE_CERTS_DEFAULT_TTL
+    age = headers.get("age", "0")
+    return max(0.0, float(match.group(1)) - (float(age) if age.isdigit() else 0.0))
+
+
+class TokenVerifierStats(BaseModel):
+    verified: int = 0
+    rejected: int = 0
+    fetches: int = 0
+    background_refreshes: int = 0
+    fetch_errors: int = 0
+
+
+class GoogleTokenVerifier:
+    def __init__(
+        self,
+        audience: Optional[str] = None,
+        certs_url: str = GOOGLE_CERTS_URL,
+        client: Optional[httpx.AsyncClient] = None,
+        refresh_margin: float = GOOGLE_CERTS_REFRESH_MARGIN,
+        clock_skew: int = GOOGLE_CLOCK_SKEW,
+        min_refetch: float = GOOGLE_CERTS_MIN_REFETCH,
+    ):
+        self.audience = audience
+        self.certs_url = certs_url
+        self.refresh_margin = refresh_margin
+        self.clock_skew = clock_skew
+        self.min_refetch = min_refetch
+        self.stats = TokenVerifierStats()
+        self._client = client
+        self._owns_client = client is None
+        self._certs: dict = {}
+        self._fetched_at = -math.inf
+        self._refresh_at = 0.0
+        self._expires_at = 0.0
+        self._fetch: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            )
+        return self._client
+
+    async def _fetch_certs(self):
+        response = await self.client.get(self.certs_url)
+        response.raise_for_status()
+        certs = response.json()
+        lifetime = cache_lifetime(response.headers)
+        now = time.monotonic()
+        self._certs = certs
+        self._fetched_at = now
+        # Never refresh more often than every half lifetime
+        self._refresh_at = now + max(lifetime - self.refresh_margin, lifetime / 2)
+        self._expires_at = now + lifetime
+        self.stats.fetches += 1
+
+    def _fetch_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.fetch_errors += 1
+            print(f"Fetching Google certificates failed: {task.exception()}")
+
+    def refresh(self) -> asyncio.Task:
+        """Start fetching the certificates unless a fetch is already running."""
+        if self._fetch is None or self._fetch.done():
+            self._fetch = asyncio.create_task(self._fetch_certs())
+            self._fetch.add_done_callback(self._fetch_done)
+        return self._fetch
+
+    async def certs(self, key_id: Optional[str] = None) -> dict:
+        now = time.monotonic()
+        if now >= self._expires_at or (
+            key_id is not None
+            and key_id not in self._certs
+            and now - self._fetched_at >= self.min_refetch
+        ):
+            # Shielded: a cancelled login must not cancel everyone's fetch
+            await asyncio.shield(self.refresh())
+        elif now >= self._refresh_at and (self._fetch is None or self._fetch.done()):
+            self.stats.background_refreshes += 1
+            self.refresh()
+        return self._certs
+
+    async def verify(self, token: str) -> Mapping[str, Any]:
+        """Check the token's signature, expiry, audience and issuer.
+
+        Returns its claims; raises ValueError if the token is not valid.
+        """
+        try:
+            key_id = jwt.decode_header(token).get("kid")
+            certs = await self.certs(key_id)
+            id_info = jwt.decode(
+                token,
+                certs=certs,
+                audience=self.audience,
+                clock_skew_in_seconds=self.clock_skew,
+            )
+            if id_info.get("iss") not in GOOGLE_ISSUERS:
+                raise ValueError(f"Wrong issuer: {id_info.get('iss')}")
+        except ValueError:
+            self.stats.rejected += 1
+            raise
+        self.stats.verified += 1
+        return id_info
+
+    async def aclose(self):
+        if self._fetch is not None and not self._fetch.done():
+            self._fetch.cancel()
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,49 @@
+"""
+Prompts for ``/grants`` recommendations.
+
+Shared by the ``/grants`` endpoints and the batch job in
+``src.backend.batch``, so both ask the model the same question.
+"""
+
+from typing import List
+
+from src.backend.models import User
+
+
+GRANTS_MODEL = "meta-llama/Llama-3.2-3B-Instruct-Turbo"
+GRANTS_SYSTEM_PROMPT = "Provide clear, accessible information to help underprivileged citizens understand the government benefits they may qualify for. Present details on financial aid, healthcare, food assistance, housing, education, and disability support. Keep the information simple, organized, and free of jargon. Include eligibility criteria, application steps, and common documentation needed. Address any barriers, like language, digital literacy, and complex processes, with straightforward guidance."
+
+
+def grants_user_info(user: User) -> str:
+    return f"""# USER INFO
+    - Occupation: {user.occupation}
+    - Income: {user.income}
+    - Demographics: {user.demographics}
+    - Affiliated Organization: {user.affiliated_organization}
+    - Birthdate: {user.birthdate}
+    """
+
+
+def grants_query(user_info: str) -> str:
+    return f"""What kind of benefits government offers to citizen having:
+    {user_info}
+    """
+
+
+def grants_messages(user: User, matches: List[dict]) -> List[dict]:
+    user_info = grants_user_info(user)
+    relevant_knowledge = "\n".join([match["metadata"]["text"] for match in matches])
+    prompt_with_relevant_data = f"""# RELEVANT KNOWLEDGE\n\n
+    {relevant_knowledge}
+    """
+
+    prompt = f"""
+    Tell user what kind of benefit they will have based on their information, relevant knowledge and your knowledge:
+    {prompt_with_relevant_data}
+    {user_info}
+    Answer in bulleted points, and provide a link to the relevant government website.
+    """
+    return [
+        {"role": "system", "content": GRANTS_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
@@ -0,0 +1,59 @@
+"""
+Session-held user identity for authenticated endpoints.
+
+``/auth`` stores the user's id, email and name in the signed session cookie,
+so ``get_current_user`` answers from the session and the endpoints that only
+need ``current_user.id`` never read the ``users`` table for it. A signed
+cookie can outlive its user, so the id is still checked against the table,
+at most once per ``USER_CHECK_TTL`` seconds per user: ``KnownUsers`` holds
+the ids found recently.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+USER_CHECK_TTL = float(os.getenv("USER_CHECK_TTL", "60"))
+KNOWN_USERS_SIZE = int(os.getenv("KNOWN_USERS_SIZE", "10000"))
+
+
+class CurrentUser(BaseModel):
+    id: int
+    email: str
+    name: str = ""
+
+
+class KnownUsersStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+
+
+class KnownUsers:
+    """Ids of users found in the ``users`` table within the last ``ttl`` seconds."""
+
+    def __init__(self, ttl: float = USER_CHECK_TTL, max_items: int = KNOWN_USERS_SIZE):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.stats = KnownUsersStats()
+        self._checked: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id: int) -> bool:
+        with self._lock:
+            checked_at = self._checked.get(user_id)
+            if checked_at is not None and time.monotonic() - checked_at < self.ttl:
+                self.stats.hits += 1
+                return True
+            self._checked.pop(user_id, None)
+            self.stats.misses += 1
+            return False
+
+    def add(self, user_id: int):
+        with self._lock:
+            self._checked[user_id] = time.monotonic()
+            self._checked.move_to_end(user_id)
+            while len(self._checked) > self.max_items:
+                self._checked.popitem(last=False)
@@ -0,0 +1,135 @@
+"""
+Lightweight schema migration for existing databases such as an old test.db.
+
+``migrate`` brings a database up to the models: it creates missing tables
+and indexes and adds missing foreign keys, rebuilding the table on SQLite,
+which cannot add constraints in place. Every step checks the live schema
+first, so on an up-to-date database it is a few catalogue reads. Rows that
+break a new foreign key are kept and reported, not deleted.
+
+    poetry run migrate --database-url sqlite:///./test.db
+"""
+
+import argparse
+import os
+import re
+from typing import List
+
+from sqlalchemy import MetaData, Table, inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import AddConstraint, CreateTable, ForeignKeyConstraint
+
+
+def missing_foreign_keys(engine: Engine, table: Table) -> List[ForeignKeyConstraint]:
+    existing = {
+        (tuple(fk["constrained_columns"]), fk["referred_table"])
+        for fk in inspect(engine).get_foreign_keys(table.name)
+    }
+    return [
+        fk
+        for fk in table.foreign_key_constraints
+        if (tuple(fk.column_keys), fk.referred_table.name) not in existing
+    ]
+
+
+def rebuild_sqlite_table(conn: Connection, table: Table):
+    """Recreate ``table`` from the model and copy its rows across.
+
+    Follows the order SQLite documents for schema changes: build the new
+    table under a temporary name, copy, drop the old one and rename the new
+    one into place. Renaming the live table instead would make SQLite (3.26+)
+    point other tables' foreign keys at the renamed copy. Run it with
+    foreign keys off.
+    """
+    new = f"_{table.name}_new"
+    old_columns = {
+        row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')
+    }
+    ddl = str(CreateTable(table).compile(conn))
+    conn.exec_driver_sql(
+        re.sub(
+            rf'^\s*CREATE TABLE "?{re.escape(table.name)}"?',
+            f'CREATE TABLE "{new}"',
+            ddl,
+            count=1,
+        )
+    )
+    columns = ", ".join(f'"{c.name}"' for c in table.columns if c.name in old_columns)
+    conn.exec_driver_sql(
+        f'INSERT INTO "{new}" ({columns}) SELECT {columns} FROM "{table.name}"'
+    )
+    # Takes the old table's indexes with it, so the model's can be recreated
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{new}" RENAME TO "{table.name}"')
+    for index in table.indexes:
+        index.create(conn)
+
+
+def add_foreign_keys(
+    engine: Engine, table: Table, constraints: List[ForeignKeyConstraint]
+):
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            for constraint in constraints:
+                conn.execute(AddConstraint(constraint))
+        return
+    with engine.connect() as conn:
+        # Foreign keys must be off while the table is swapped out, and the
+        # pragma only takes effect outside a transaction; the check below
+        # reports rows the new constraints reject
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.exec_driver_sql("BEGIN")
+        try:
+            rebuild_sqlite_table(conn, table)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        orphans = conn.exec_driver_sql(
+            f'PRAGMA foreign_key_check("{table.name}")'
+        ).fetchall()
+    if orphans:
+        print(f"Warning: {len(orphans)} rows in {table.name} reference missing rows")
+
+
+def migrate(engine: Engine, metadata: MetaData) -> List[str]:
+    """Bring the database up to ``metadata``; returns the changes made."""
+    changes = []
+    existing_tables = set(inspect(engine).get_table_names())
+    metadata.create_all(engine)
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            changes.append(f"created table {table.name}")
+            continue
+        constraints = missing_foreign_keys(engine, table)
+        if constraints:
+            add_foreign_keys(engine, table, constraints)
+            changes.append(f"added {len(constraints)} foreign keys to {table.name}")
+        indexes = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(engine)
+                changes.append(f"created index {index.name}")
+    for change in changes:
+        print(f"Migration: {change}")
+    return changes
+
+
+def run_migrations():
+    parser = argparse.ArgumentParser(description="Migrate the backend database")
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DB_AUTO_MIGRATE"] = "false"
+
+    from src.backend.app import Base, engine
+
+    changes = migrate(engine, Base.metadata)
+    print(f"Schema up to date ({len(changes)} changes)")
+
+
+if __name__ == "__main__":
+    run_migrations()
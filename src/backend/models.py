@@ -0,0 +1,56 @@
+"""
+SQLAlchemy models of the backend database.
+
+They live apart from ``src.backend.app`` so that the batch job and the
+reminder scheduler can use them without importing the web app.
+"""
+
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from src.backend.database import Base
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, unique=True, index=True)
+    name = Column(String)
+    occupation = Column(String, nullable=True)
+    income = Column(String, nullable=True)
+    demographics = Column(String, nullable=True)
+    affiliated_organization = Column(String, nullable=True)
+    birthdate = Column(Date, nullable=True)
+
+
+class Grant(Base):
+    __tablename__ = "grants"
+    id = Column(String, primary_key=True, index=True)
+    name = Column(String)
+    deadline = Column(Date, index=True)
+    documents_needed = Column(String)
+    steps_to_apply = Column(String)
+    link = Column(String)
+    user_id = Column(
+        Integer, ForeignKey("users.id")
+    )  # Associate grants with a specific user
+    user = relationship("User")  # Define relationship with User
+
+
+class AppliedGrant(Base):
+    __tablename__ = "applied_grants"
+    # /applied-grants and /update-grant-status look applications up by user
+    __table_args__ = (Index("ix_applied_grants_user_id_id", "user_id", "id"),)
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    grant_id = Column(String, ForeignKey("grants.id"), index=True)
+    status = Column(Integer)
+    current_status = Column(String)
+
+
+class Recommendation(Base):
+    __tablename__ = "recommendations"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    content = Column(String)
+    index_version = Column(Integer)
+    created_at = Column(DateTime)
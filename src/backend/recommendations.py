@@ -0,0 +1,142 @@
+"""
+Cache of generated ``/grants`` recommendations.
+
+An answer depends only on the profile fields that go into the prompt and on
+the contents of the vector index, so entries are keyed on a hash of the
+normalized profile plus the index version: users with the same profile share
+an entry, and re-ingestion makes old entries unreachable. Entries expire
+after ``ttl`` seconds and the least recently used are evicted past
+``max_items``.
+
+Entries live in an in-process LRU. With ``path`` (``RECOMMENDATION_CACHE_PATH``)
+set they are also written to a SQLite file, so workers of the same
+deployment share answers and survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from pydantic import BaseModel
+
+PROFILE_FIELDS = (
+    "occupation",
+    "income",
+    "demographics",
+    "affiliated_organization",
+    "birthdate",
+)
+
+
+class RecommendationCacheStats(BaseModel):
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+
+def profile_key(user, index_version: int) -> str:
+    fields = []
+    for name in PROFILE_FIELDS:
+        value = getattr(user, name, None)
+        fields.append(" ".join(str(value).lower().split()) if value else "")
+    payload = json.dumps([index_version, fields])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RecommendationCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_items: Optional[int] = None,
+    ):
+        self.path = path or os.getenv("RECOMMENDATION_CACHE_PATH")
+        self.ttl = ttl or float(os.getenv("RECOMMENDATION_CACHE_TTL", "86400"))
+        self.max_items = max_items or int(
+            os.getenv("RECOMMENDATION_CACHE_SIZE", "10000")
+        )
+        self.stats = RecommendationCacheStats()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+            if self.path:
+                row = self._db().execute(
+                    "SELECT content, created_at FROM recommendations WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row and now - row[1] < self.ttl:
+                    self._remember(key, row[0], row[1])
+                    self.stats.disk_hits += 1
+                    return row[0]
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, content: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, content, now)
+            if self.path:
+                with self._db() as db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO recommendations (key, content, created_at) VALUES (?, ?, ?)",
+                        (key, content, now),
+                    )
+                    # Keep the shared file bounded too, dropping the oldest entries
+                    db.execute(
+                        """
+                        DELETE FROM recommendations WHERE key IN (
+                            SELECT key FROM recommendations
+                            ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                        ) OR created_at < ?
+                        """,
+                        (self.max_items, now - self.ttl),
+                    )
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self.stats.invalidations += 1
+            self._memory.pop(key, None)
+            if self.path:
+                with self._db() as db:
+                    db.execute("DELETE FROM recommendations WHERE key = ?", (key,))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recommendations "
+                "(key TEXT PRIMARY KEY, content TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_recommendations_created_at "
+                "ON recommendations (created_at)"
+            )
+        return self._conn
+
+    def _remember(self, key: str, content: str, created_at: float):
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
@@ -0,0 +1,312 @@
+"""
+Deadline reminders for tracked and applied-for grants.
+
+``ReminderScheduler`` keeps the reminders due within ``horizon`` in a heap
+ordered by send time and sleeps until the earliest one is due or the window
+runs out; it never polls. The heap is filled by range queries on the
+``grants.deadline`` index, one per offset in ``REMINDER_DAYS`` (days before
+the deadline), so a load reads only the grants whose reminders fall in the
+window, however many applications there are. Each window reaches ``grace``
+into the past, which picks up grants created after their window was loaded
+and reminders missed while the scheduler was down. Reminders already sent
+are recorded in the notification ledger, so that overlap never sends one
+twice.
+
+Due reminders are grouped into one email per user (the grant's owner and
+everyone whose application is not finished) and handed to the notification
+dispatcher, which sends them in bulk requests. Reminders whose email
+failed go back on the heap with exponential backoff (from
+``REMINDER_RETRY_MINUTES``) until their grace period runs out.
+
+    poetry run reminders
+"""
+
+import argparse
+import asyncio
+import hashlib
+import heapq
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel
+from sqlalchemy import or_, select, union
+
+from src.backend.database import AsyncSessionLocal
+from src.backend.models import AppliedGrant, Grant, User
+from src.functions.sendNotification.dispatcher import (
+    Notification,
+    NotificationDispatcher,
+    NotificationLedger,
+)
+
+REMINDER_DAYS = [int(days) for days in os.getenv("REMINDER_DAYS", "7,1").split(",")]
+# Reminders go out at this hour (UTC) on their day
+REMINDER_HOUR = int(os.getenv("REMINDER_HOUR", "9"))
+REMINDER_HORIZON = timedelta(hours=float(os.getenv("REMINDER_HORIZON_HOURS", "1")))
+REMINDER_GRACE = timedelta(hours=float(os.getenv("REMINDER_GRACE_HOURS", "24")))
+# First delay before a failed reminder is retried; doubles per attempt
+REMINDER_RETRY_DELAY = timedelta(
+    minutes=float(os.getenv("REMINDER_RETRY_MINUTES", "5"))
+)
+# AppliedGrant.status is a completion percentage
+COMPLETED_STATUS = 100
+
+
+class Reminder(BaseModel):
+    user_id: int
+    grant_id: str
+    grant_name: str = ""
+    link: Optional[str] = None
+    deadline: date
+    days_before: int
+    send_at: datetime
+
+    @property
+    def key(self) -> str:
+        return (
+            f"reminder:{self.user_id}:{self.grant_id}:"
+            f"{self.deadline}:{self.days_before}"
+        )
+
+
+class ReminderStats(BaseModel):
+    loads: int = 0
+    loaded: int = 0
+    sent: int = 0
+    emails: int = 0
+    retried: int = 0
+    # Reminders given up on after their grace period
+    failed: int = 0
+    load_seconds: float = 0.0
+
+
+def send_time(deadline: date, days_before: int, hour: int = REMINDER_HOUR) -> datetime:
+    day = deadline - timedelta(days=days_before)
+    return datetime(day.year, day.month, day.day, hour)
+
+
+def reminder_email(user: User, reminders: List[Reminder]) -> Notification:
+    reminders = sorted(reminders, key=lambda reminder: reminder.deadline)
+    lines = [
+        f"{reminder.grant_name or 'Grant'}: due {reminder.deadline:%B %d, %Y}"
+        + (f" ({reminder.link})" if reminder.link else "")
+        for reminder in reminders
+    ]
+    digest = hashlib.sha256(
+        "\0".join(sorted(reminder.key for reminder in reminders)).encode()
+    ).hexdigest()
+    plural = "s" if len(reminders) > 1 else ""
+    return Notification(
+        to_email=user.email,
+        to_name=user.name or "",
+        subject=f"{len(reminders)} grant deadline{plural} coming up",
+        html_content="<ul>" + "".join(f"<li>{line}</li>" for line in lines) + "</ul>",
+        text_content="\n".join(f"- {line}" for line in lines),
+        idempotency_key=f"reminders:{user.id}:{digest}",
+    )
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        days_before: List[int] = REMINDER_DAYS,
+        hour: int = REMINDER_HOUR,
+        horizon: timedelta = REMINDER_HORIZON,
+        grace: timedelta = REMINDER_GRACE,
+        retry_delay: timedelta = REMINDER_RETRY_DELAY,
+        ledger: Optional[NotificationLedger] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.session_factory = session_factory
+        self.days_before = days_before
+        self.hour = hour
+        self.horizon = horizon
+        self.grace = grace
+        self.retry_delay = retry_delay
+        self.ledger = ledger or NotificationLedger()
+        self.client = client
+        self.clock = clock
+        self.stats = ReminderStats()
+        self._heap: List[Tuple[datetime, str, Reminder]] = []
+        # Keys queued, sent or given up on by this process, with their send
+        # time for pruning
+        self._scheduled: Dict[str, datetime] = {}
+        # Failed sends per key, for the retry backoff
+        self._attempts: Dict[str, int] = {}
+        self._loaded_until: Optional[datetime] = None
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            now = self.clock()
+            if self._loaded_until is None or now >= self._loaded_until:
+                await self.load(now)
+            due = self.pop_due(now)
+            if due:
+                await self.send(due)
+                continue
+            wake_at = self._loaded_until
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+            delay = (wake_at - self.clock()).total_seconds()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=max(delay, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def load(self, now: datetime):
+        started = time.perf_counter()
+        start, end = now - self.grace, now + self.horizon
+        reminders = [
+            reminder
+            for reminder in await self.load_window(start, end)
+            if reminder.key not in self._scheduled
+        ]
+        sent = self.ledger.sent([reminder.key for reminder in reminders])
+        for reminder in reminders:
+            self._scheduled[reminder.key] = reminder.send_at
+            if reminder.key not in sent:
+                heapq.heappush(self._heap, (reminder.send_at, reminder.key, reminder))
+                self.stats.loaded += 1
+        self._scheduled = {
+            key: send_at for key, send_at in self._scheduled.items() if send_at >= start
+        }
+        self._attempts = {
+            key: count
+            for key, count in self._attempts.items()
+            if key in self._scheduled
+        }
+        self._loaded_until = end
+        self.stats.loads += 1
+        self.stats.load_seconds += time.perf_counter() - started
+
+    async def load_window(self, start: datetime, end: datetime) -> List[Reminder]:
+        """Reminders with ``start <= send_at < end``, via the deadline index."""
+        reminders = []
+        async with self.session_factory() as db:
+            for days in self.days_before:
+                # Deadlines whose reminder ``days`` before falls in the window
+                shift = timedelta(days=days, hours=-self.hour)
+                low, high = (start + shift).date(), (end + shift).date()
+                in_window = Grant.deadline.between(low, high)
+                columns = (Grant.id, Grant.name, Grant.link, Grant.deadline)
+                owners = select(Grant.user_id, *columns).where(
+                    in_window, Grant.user_id.is_not(None)
+                )
+                applicants = (
+                    select(AppliedGrant.user_id, *columns)
+                    .join(Grant, Grant.id == AppliedGrant.grant_id)
+                    .where(
+                        in_window,
+                        AppliedGrant.user_id.is_not(None),
+                        or_(
+                            AppliedGrant.status.is_(None),
+                            AppliedGrant.status < COMPLETED_STATUS,
+                        ),
+                    )
+                )
+                rows = await db.execute(union(owners, applicants))
+                for user_id, grant_id, name, link, deadline in rows:
+                    send_at = send_time(deadline, days, self.hour)
+                    if start <= send_at < end:
+                        reminders.append(
+                            Reminder(
+                                user_id=user_id,
+                                grant_id=grant_id,
+                                grant_name=name or "",
+                                link=link,
+                                deadline=deadline,
+                                days_before=days,
+                                send_at=send_at,
+                            )
+                        )
+        return reminders
+
+    def pop_due(self, now: datetime) -> List[Reminder]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    async def send(self, reminders: List[Reminder]):
+        by_user: Dict[int, List[Reminder]] = {}
+        for reminder in reminders:
+            by_user.setdefault(reminder.user_id, []).append(reminder)
+        users = {}
+        async with self.session_factory() as db:
+            ids = list(by_user)
+            for i in range(0, len(ids), 500):
+                result = await db.execute(
+                    select(User).where(User.id.in_(ids[i : i + 500]))
+                )
+                users.update((user.id, user) for user in result.scalars())
+
+        emails = {}
+        async with NotificationDispatcher(
+            client=self.client, ledger=self.ledger
+        ) as dispatcher:
+            for user_id, items in by_user.items():
+                user = users.get(user_id)
+                if user is None or not user.email:
+                    continue
+                notification = reminder_email(user, items)
+                emails[notification.key] = items
+                await dispatcher.put(notification)
+        failed = {notification.key for notification in dispatcher.failed}
+        sent = [
+            reminder
+            for key, items in emails.items()
+            if key not in failed
+            for reminder in items
+        ]
+        self.ledger.record(reminder.key for reminder in sent)
+        for reminder in sent:
+            self._attempts.pop(reminder.key, None)
+        self.stats.sent += len(sent)
+        self.stats.emails += len(emails) - len(failed)
+        now = self.clock()
+        for key in failed:
+            for reminder in emails[key]:
+                self.retry(reminder, now)
+
+    def retry(self, reminder: Reminder, now: datetime):
+        """Queue a failed reminder again, backing off, while it is still in grace."""
+        attempt = self._attempts.get(reminder.key, 0)
+        retry_at = now + self.retry_delay * 2**attempt
+        if retry_at >= reminder.send_at + self.grace:
+            # Still in _scheduled, so later loads do not queue it again
+            self._attempts.pop(reminder.key, None)
+            self.stats.failed += 1
+            return
+        self._attempts[reminder.key] = attempt + 1
+        heapq.heappush(self._heap, (retry_at, reminder.key, reminder))
+        self.stats.retried += 1
+
+
+def run_reminders():
+    parser = argparse.ArgumentParser(description="Send grant deadline reminders")
+    parser.add_argument(
+        "--once", action="store_true", help="Send what is due now and exit"
+    )
+    args = parser.parse_args()
+
+    async def main():
+        scheduler = ReminderScheduler()
+        if args.once:
+            now = scheduler.clock()
+            await scheduler.load(now)
+            await scheduler.send(scheduler.pop_due(now))
+        else:
+            await scheduler.run()
+        return scheduler.stats
+
+    print(f"Done: {asyncio.run(main())}")
+
+
+if __name__ == "__main__":
+    run_reminders()
@@ -0,0 +1,45 @@
+"""
+Per-request latency breakdown.
+
+``RequestTimer`` accumulates the wall time of named steps in a request and
+renders them as a ``Server-Timing`` header, which browser dev tools show per
+request, plus a one-line log. ``mark`` records a point in time since the
+start of the request, such as the first streamed token.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: Dict[str, float] = {}
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.steps[name] = self.steps.get(name, 0.0) + elapsed
+
+    def mark(self, name: str):
+        # Only the first call counts, so marks can be set inside loops
+        if name not in self.steps:
+            self.steps[name] = (time.perf_counter() - self.started) * 1000
+
+    @property
+    def total(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        entries = [f"{name};dur={ms:.1f}" for name, ms in self.steps.items()]
+        entries.append(f"total;dur={self.total:.1f}")
+        return ", ".join(entries)
+
+    def log(self, label: str):
+        steps = " ".join(f"{name}={ms:.1f}ms" for name, ms in self.steps.items())
+        print(f"{label} {steps} total={self.total:.1f}ms")
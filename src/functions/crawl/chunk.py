@@ -0,0 +1,125 @@
+"""
+Token-window chunking of crawled pages for embedding.
+
+Text is first split into sections at markdown headings (the format of both
+``html2text`` output and LlamaParse PDFs), then each section is cut into
+windows of at most ``max_tokens`` tokens that overlap by ``overlap_tokens``.
+Window ends snap back to the nearest line or sentence break when one is
+close. Tokens are approximated as words and punctuation marks, which tracks
+the embedding model's wordpiece count closely enough for sizing windows.
+"""
+
+import re
+from typing import List, Tuple
+
+from pydantic import BaseModel, Field
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$", re.MULTILINE)
+SENTENCE_END = {".", "!", "?", ":", ";"}
+
+
+class ChunkConfig(BaseModel):
+    max_tokens: int = Field(default=200, description="Maximum tokens per chunk")
+    overlap_tokens: int = Field(
+        default=30, description="Tokens repeated from the end of the previous chunk"
+    )
+    min_tokens: int = Field(
+        default=5, description="Chunks with fewer tokens are dropped"
+    )
+
+
+class Chunk(BaseModel):
+    text: str
+    source_url: str
+    title: str = ""
+    section: str = Field(default="", description="Heading path, e.g. 'SNAP > Eligibility'")
+    start: int = Field(description="Start offset in the page text")
+    end: int = Field(description="End offset in the page text")
+    token_count: int
+
+    @property
+    def metadata(self) -> dict:
+        return {
+            "text": self.text,
+            "source_url": self.source_url,
+            "title": self.title,
+            "section": self.section,
+            "start": self.start,
+            "end": self.end,
+        }
+
+
+def split_sections(text: str) -> List[Tuple[str, int, int]]:
+    """Split markdown into ``(heading_path, start, end)`` spans."""
+    sections = []
+    path: List[Tuple[int, str]] = []
+    start = 0
+    for match in HEADING_PATTERN.finditer(text):
+        if match.start() > start:
+            sections.append((" > ".join(h for _, h in path), start, match.start()))
+        level = len(match.group(1))
+        path = [(lvl, h) for lvl, h in path if lvl < level] + [(level, match.group(2))]
+        start = match.start()
+    sections.append((" > ".join(h for _, h in path), start, len(text)))
+    return sections
+
+
+def _is_boundary(text: str, spans: List[Tuple[int, int]], i: int) -> bool:
+    """Whether a chunk may end just before token ``i``."""
+    prev_start, prev_end = spans[i - 1]
+    return (
+        "\n" in text[prev_end : spans[i][0]]
+        or text[prev_start:prev_end] in SENTENCE_END
+    )
+
+
+def _windows(text: str, spans: List[Tuple[int, int]], config: ChunkConfig):
+    count = len(spans)
+    start = 0
+    while start < count:
+        end = min(start + config.max_tokens, count)
+        if end < count:
+            floor = start + config.max_tokens // 2
+            for i in range(end, floor, -1):
+                if _is_boundary(text, spans, i):
+                    end = i
+                    break
+        yield start, end
+        if end >= count:
+            break
+        # Start the overlap at a sentence break when there is one
+        next_start = max(end - config.overlap_tokens, start + 1)
+        for i in range(next_start, end):
+            if _is_boundary(text, spans, i):
+                next_start = i
+                break
+        start = next_start
+
+
+def chunk_text(
+    text: str, source_url: str, title: str = "", config: ChunkConfig = None
+) -> List[Chunk]:
+    config = config or ChunkConfig()
+    chunks = []
+    for section, section_start, section_end in split_sections(text):
+        body = text[section_start:section_end]
+        spans = [m.span() for m in TOKEN_PATTERN.finditer(body)]
+        for first, last in _windows(body, spans, config):
+            token_count = last - first
+            if token_count < config.min_tokens:
+                continue
+            start = section_start + spans[first][0]
+            end = section_start + spans[last - 1][1]
+            chunks.append(
+                Chunk(
+                    text=text[start:end],
+                    source_url=source_url,
+                    title=title,
+                    section=section,
+                    start=start,
+                    end=end,
+                    token_count=token_count,
+                )
+            )
+    return chunks
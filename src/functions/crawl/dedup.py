@@ -0,0 +1,271 @@
+"""
+Content deduplication between crawling and embedding.
+
+Texts are keyed on a hash of their normalized form (case-folded, whitespace
+collapsed) so the nav menus, footers and banners repeated across government
+sites are embedded once. With ``near_duplicates`` enabled, a 64-bit SimHash
+also drops texts within ``max_distance`` bits of one already seen.
+
+Both indexes live in SQLite and persist across runs. ``filter`` only stages
+new entries; call ``commit`` once they are stored in the vector index so a
+failed upsert does not hide them from the next run.
+
+A text is stored once, under the page that first carried it: that page's
+URL is part of the vector id. Every page whose text a stored hash covers,
+exact or near duplicate, is recorded as one of its carriers, so the vector
+outlives its first page for as long as any page still carries the text.
+``orphans`` lists the hashes nothing carries any more; ``forget`` releases
+them once their vectors are deleted.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_hashes (
+    hash TEXT PRIMARY KEY,
+    source_url TEXT,
+    first_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_content_hashes_source_url ON content_hashes (source_url);
+CREATE TABLE IF NOT EXISTS hash_carriers (
+    hash TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    PRIMARY KEY (hash, source_url)
+);
+CREATE INDEX IF NOT EXISTS ix_hash_carriers_source_url ON hash_carriers (source_url);
+CREATE TABLE IF NOT EXISTS simhash_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    simhash INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_simhash_bands ON simhash_bands (band, bucket);
+CREATE INDEX IF NOT EXISTS ix_simhash_bands_hash ON simhash_bands (hash);
+"""
+
+SIMHASH_BITS = 64
+# Four 16-bit bands: two hashes within 3 bits always share at least one band.
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode()).hexdigest()
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) > shingle_size:
+        features = [
+            " ".join(tokens[i : i + shingle_size])
+            for i in range(len(tokens) - shingle_size + 1)
+        ]
+    else:
+        features = tokens
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        value = int.from_bytes(
+            hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big"
+        )
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(value: int) -> List[Tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band, value >> (band * BAND_BITS) & mask) for band in range(SIMHASH_BANDS)]
+
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit.
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
+
+
+class DedupStats(BaseModel):
+    seen: int = 0
+    kept: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+
+
+class Deduplicator:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        near_duplicates: bool = False,
+        max_distance: int = 3,
+    ):
+        if max_distance >= SIMHASH_BANDS:
+            raise ValueError(f"max_distance must be below {SIMHASH_BANDS}")
+        self.path = path or os.getenv("DEDUP_INDEX_PATH", "crawl_state.db")
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        had_carriers = self.conn.execute(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'hash_carriers'"
+        ).fetchone()
+        self.conn.executescript(SCHEMA)
+        if not had_carriers:
+            # Older indexes only know each hash's first page
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO hash_carriers (hash, source_url) "
+                    "SELECT hash, source_url FROM content_hashes "
+                    "WHERE source_url IS NOT NULL"
+                )
+        self.stats = DedupStats()
+        self._pending_hashes: Dict[str, Optional[str]] = {}
+        self._pending_simhashes: Dict[Tuple[int, int], List[Tuple[int, str]]] = {}
+        self._pending_carriers: Dict[str, Set[str]] = {}
+
+    def close(self):
+        self.conn.close()
+
+    def filter(self, texts: Iterable[str], source_url: Optional[str] = None) -> List[str]:
+        """Return the texts not seen before, staging them for ``commit``.
+
+        ``texts`` are all of ``source_url``'s texts: the hashes covering them
+        replace what the page carried before.
+        """
+        kept = []
+        carried = set()
+        for text in texts:
+            self.stats.seen += 1
+            digest = content_hash(text)
+            carried.add(digest)
+            if digest in self._pending_hashes or self._hash_exists(digest):
+                self.stats.exact_duplicates += 1
+                continue
+            if self.near_duplicates:
+                fingerprint = simhash(text)
+                match = self._near_duplicate(fingerprint)
+                if match is not None:
+                    self.stats.near_duplicates += 1
+                    carried.discard(digest)
+                    carried.add(match)
+                    continue
+                for key in _bands(fingerprint):
+                    self._pending_simhashes.setdefault(key, []).append(
+                        (fingerprint, digest)
+                    )
+            self._pending_hashes[digest] = source_url
+            kept.append(text)
+        self.stats.kept += len(kept)
+        if source_url is not None:
+            self._pending_carriers[source_url] = carried
+        return kept
+
+    def drop_pages(self, urls: Iterable[str]):
+        """Stage that ``urls`` no longer carry any text."""
+        for url in urls:
+            self._pending_carriers[url] = set()
+
+    def commit(self):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO content_hashes (hash, source_url, first_seen) VALUES (?, ?, ?)",
+                [(digest, url, now) for digest, url in self._pending_hashes.items()],
+            )
+            self.conn.executemany(
+                "INSERT INTO simhash_bands (band, bucket, simhash, hash) VALUES (?, ?, ?, ?)",
+                [
+                    (band, bucket, _to_signed(fingerprint), digest)
+                    for (band, bucket), entries in self._pending_simhashes.items()
+                    for fingerprint, digest in entries
+                ],
+            )
+            for url, hashes in self._pending_carriers.items():
+                self.conn.execute(
+                    "DELETE FROM hash_carriers WHERE source_url = ?", (url,)
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO hash_carriers (hash, source_url) VALUES (?, ?)",
+                    [(digest, url) for digest in hashes],
+                )
+        self.rollback()
+
+    def rollback(self):
+        self._pending_hashes.clear()
+        self._pending_simhashes.clear()
+        self._pending_carriers.clear()
+
+    def orphans(self) -> List[Tuple[str, str]]:
+        """``(source_url, hash)`` of stored vectors that no page carries."""
+        rows = self.conn.execute(
+            """
+            SELECT source_url, hash FROM content_hashes
+            WHERE source_url IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM hash_carriers AS c WHERE c.hash = content_hashes.hash
+            )
+            """
+        )
+        return [(url, digest) for url, digest in rows]
+
+    def carried(self, hashes: List[str]) -> Set[str]:
+        """The ``hashes`` that some page carries."""
+        found = set()
+        for i in range(0, len(hashes), 500):
+            batch = hashes[i : i + 500]
+            rows = self.conn.execute(
+                "SELECT DISTINCT hash FROM hash_carriers WHERE hash IN (%s)"
+                % ",".join("?" * len(batch)),
+                batch,
+            )
+            found.update(digest for (digest,) in rows)
+        return found
+
+    def forget(self, hashes: Iterable[str]):
+        params = [(digest,) for digest in hashes]
+        with self.conn:
+            self.conn.executemany("DELETE FROM content_hashes WHERE hash = ?", params)
+            self.conn.executemany("DELETE FROM simhash_bands WHERE hash = ?", params)
+
+    def _hash_exists(self, digest: str) -> bool:
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM content_hashes WHERE hash = ?", (digest,)
+            ).fetchone()
+            is not None
+        )
+
+    def _near_duplicate(self, fingerprint: int) -> Optional[str]:
+        """Hash of a stored text within ``max_distance`` bits, if there is one."""
+        for band, bucket in _bands(fingerprint):
+            for candidate, digest in self._pending_simhashes.get((band, bucket), []):
+                if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    return digest
+            rows = self.conn.execute(
+                "SELECT simhash, hash FROM simhash_bands WHERE band = ? AND bucket = ?",
+                (band, bucket),
+            )
+            for candidate, digest in rows:
+                if (
+                    hamming_distance(fingerprint, _to_unsigned(candidate))
+                    <= self.max_distance
+                ):
+                    return digest
+        return None
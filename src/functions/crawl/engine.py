@@ -0,0 +1,324 @@
+"""
+Breadth-first asynchronous crawler used by ``web_crawler``.
+
+URLs are pulled off a shared frontier by a bounded pool of workers. Every
+request goes through one pooled ``httpx.AsyncClient`` and a per-host limiter
+that caps concurrent connections and spaces out requests to the same host.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urldefrag, urlparse
+
+import httpx
+from pydantic import BaseModel, Field
+
+from src.functions.crawl.fetch import (
+    FetchedPage,
+    FetchStats,
+    clean_text,
+    extract_links,
+    extract_text,
+    extract_title,
+    fetch_page,
+)
+from src.functions.crawl.state import RUN_LEASE, CrawlState, PageRecord
+
+
+class CrawlConfig(BaseModel):
+    max_depth: int = Field(default=4, description="Maximum link depth from a start URL")
+    max_pages: int = Field(default=500, description="Maximum number of pages per crawl")
+    concurrency: int = Field(default=16, description="Number of crawl workers")
+    per_host_concurrency: int = Field(
+        default=4, description="Maximum in-flight requests per host"
+    )
+    politeness_delay: float = Field(
+        default=0.25, description="Minimum seconds between requests to the same host"
+    )
+    timeout: float = Field(default=20.0, description="Per-request timeout in seconds")
+    user_agent: str = Field(
+        default="gov-benefit-crawler/0.1", description="User-Agent header sent"
+    )
+
+
+class CrawledPage(BaseModel):
+    url: str
+    depth: int
+    title: str = ""
+    text: str = ""
+    links: List[str] = Field(default_factory=list)
+    changed: bool = Field(
+        default=True, description="False when the page matches what is already indexed"
+    )
+
+
+def is_same_domain(base_url, new_url):
+    return urlparse(base_url).netloc == urlparse(new_url).netloc
+
+
+def create_http_client(config: CrawlConfig) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=config.concurrency,
+        max_keepalive_connections=config.concurrency,
+    )
+    return httpx.AsyncClient(
+        timeout=config.timeout,
+        limits=limits,
+        follow_redirects=True,
+        headers={"User-Agent": config.user_agent},
+    )
+
+
+def _is_gone(error: Exception) -> bool:
+    return isinstance(
+        error, httpx.HTTPStatusError
+    ) and error.response.status_code in (404, 410)
+
+
+class HostLimiter:
+    """Caps concurrent requests per host and spaces consecutive ones apart."""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        semaphore = self._semaphores.setdefault(
+            host, asyncio.Semaphore(self.concurrency)
+        )
+        async with semaphore:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+
+class Crawler:
+    """Frontier-based crawler bounded by ``max_depth`` and ``max_pages``.
+
+    ``pdf_parser`` is awaited with the URL, the temporary file every PDF was
+    streamed to and its sha256, and must return documents with a ``text``
+    attribute (see ``PdfParser``). PDFs are skipped when it is not set.
+
+    With a ``state`` store the crawl is resumable and incremental: pending URLs
+    are persisted, an abandoned unfinished run over the same start URLs is
+    picked up where it stopped, and known pages are revalidated with
+    conditional requests. Pages whose content is
+    already indexed come back with ``changed=False`` and no text. The caller
+    owns the run: mark pages indexed and call ``state.finish_run(run_id)``.
+    """
+
+    def __init__(
+        self,
+        config: Optional[CrawlConfig] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        pdf_parser: Optional[Callable[[str, str, str], Awaitable[list]]] = None,
+        state: Optional[CrawlState] = None,
+    ):
+        self.config = config or CrawlConfig()
+        self.client = client
+        self.pdf_parser = pdf_parser
+        self.state = state
+        self.run_id: Optional[int] = None
+        self.resumed = False
+        self.stats = FetchStats()
+        self.limiter = HostLimiter(
+            self.config.per_host_concurrency, self.config.politeness_delay
+        )
+        self._frontier: Optional[asyncio.Queue] = None
+        self._seen: Set[str] = set()
+        self._pages: List[CrawledPage] = []
+        self._on_page: Optional[Callable[[CrawledPage], Awaitable[None]]] = None
+        # URLs that errored for reasons other than the page being gone
+        self.failed: Set[str] = set()
+
+    async def crawl(
+        self,
+        start_urls: List[str],
+        on_page: Optional[Callable[[CrawledPage], Awaitable[None]]] = None,
+    ) -> List[CrawledPage]:
+        """Crawl from ``start_urls`` and return the pages found.
+
+        When ``on_page`` is given, each page is handed to it as soon as it is
+        fetched and not kept, so a slow consumer holds back the workers.
+        """
+        self._on_page = on_page
+        owns_client = self.client is None
+        if owns_client:
+            self.client = create_http_client(self.config)
+
+        self._frontier = asyncio.Queue()
+        self._seen = set()
+        self._pages = []
+        self.failed = set()
+        self.stats = FetchStats()
+        self.resumed = False
+        if self.state is not None:
+            self.run_id, self.resumed = self.state.open_run(start_urls)
+        if self.resumed:
+            self._seen = self.state.visited_in_run(self.run_id)
+            pending = self.state.resume_frontier(self.run_id)
+            print(f"Resuming crawl run {self.run_id} with {len(pending)} pending URLs")
+            for url, depth in pending:
+                self._seen.discard(url)
+                self._enqueue(url, depth)
+        else:
+            for url in start_urls:
+                self._enqueue(url, 0)
+
+        workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.config.concurrency)
+        ]
+        if self.state is not None:
+            workers.append(asyncio.create_task(self._renew_lease()))
+        joined = asyncio.ensure_future(self._frontier.join())
+        try:
+            done, _ = await asyncio.wait(
+                [joined, *workers], return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task is not joined:
+                    # Workers only stop when on_page fails; surface its error
+                    task.result()
+        finally:
+            joined.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if owns_client:
+                await self.client.aclose()
+                self.client = None
+        return self._pages
+
+    @property
+    def truncated(self) -> bool:
+        """Whether ``max_pages`` cut the crawl short."""
+        return len(self._seen) >= self.config.max_pages
+
+    def _enqueue(self, url: str, depth: int):
+        url, _ = urldefrag(url)
+        if urlparse(url).scheme not in ("http", "https"):
+            return
+        if url in self._seen or len(self._seen) >= self.config.max_pages:
+            return
+        self._seen.add(url)
+        if self.state is not None:
+            self.state.add_to_frontier(self.run_id, url, depth)
+        self._frontier.put_nowait((url, depth))
+
+    async def _renew_lease(self):
+        # Keeps other crawlers from resuming this run while it is in progress
+        while True:
+            await asyncio.sleep(RUN_LEASE / 4)
+            self.state.renew_run(self.run_id)
+
+    async def _worker(self):
+        while True:
+            url, depth = await self._frontier.get()
+            try:
+                page = await self._process(url, depth)
+            except Exception as e:
+                print(f"Failed to crawl {url}: {e}")
+                if not _is_gone(e):
+                    self.failed.add(url)
+                page = None
+            # A failing on_page is not the URL's fault: it ends the crawl
+            if page is not None:
+                await self._handle(url, depth, page)
+            # Not in a finally: a cancelled fetch must stay in the persisted
+            # frontier so a resumed run picks it up again.
+            if self.state is not None:
+                self.state.remove_from_frontier(self.run_id, url)
+            self._frontier.task_done()
+
+    async def _handle(self, url: str, depth: int, page: CrawledPage):
+        if self._on_page is not None:
+            await self._on_page(page)
+        else:
+            self._pages.append(page)
+        if depth < self.config.max_depth:
+            for link in page.links:
+                if is_same_domain(url, link):
+                    self._enqueue(link, depth + 1)
+
+    async def _process(self, url: str, depth: int) -> Optional[CrawledPage]:
+        print(f"Crawling: {url} at depth {depth}")
+        if url.lower().endswith(".pdf") and self.pdf_parser is None:
+            return None
+
+        record = self.state.get_page(url) if self.state is not None else None
+        headers = record.conditional_headers() if record is not None else None
+        async with self.limiter.slot(urlparse(url).netloc):
+            fetched = await fetch_page(self.client, url, headers)
+        try:
+            return await self._build_page(url, depth, record, fetched)
+        finally:
+            fetched.discard()
+
+    async def _build_page(
+        self,
+        url: str,
+        depth: int,
+        record: Optional[PageRecord],
+        fetched: FetchedPage,
+    ) -> Optional[CrawledPage]:
+        if fetched.not_modified:
+            self.stats.not_modified += 1
+            self.state.record_not_modified(self.run_id, url, depth)
+            return CrawledPage(url=url, depth=depth, links=record.links, changed=False)
+        self.stats.record(fetched)
+
+        content_hash = fetched.content_hash
+        changed = record is None or record.indexed_hash != content_hash
+        if not changed:
+            self.stats.unchanged += 1
+
+        if fetched.is_pdf:
+            if self.pdf_parser is None:
+                return None
+            title = fetched.url.rsplit("/", 1)[-1]
+            page = CrawledPage(url=url, depth=depth, title=title, changed=changed)
+            if changed:
+                documents = await self.pdf_parser(
+                    fetched.url, fetched.path, fetched.digest
+                )
+                text = "\n".join(doc.text for doc in documents if doc.text.strip())
+                page.text = clean_text(text)
+        elif fetched.is_html:
+            page = CrawledPage(
+                url=url,
+                depth=depth,
+                title=extract_title(fetched),
+                text=extract_text(fetched) if changed else "",
+                links=extract_links(fetched),
+                changed=changed,
+            )
+        else:
+            return None
+
+        if self.state is not None:
+            self.state.record_page(
+                self.run_id,
+                url,
+                depth,
+                content_hash,
+                fetched.etag,
+                fetched.last_modified,
+                page.links,
+            )
+        return page
+
+
+async def crawl_sites(
+    start_urls: List[str],
+    config: Optional[CrawlConfig] = None,
+    pdf_parser: Optional[Callable[[str, str, str], Awaitable[list]]] = None,
+) -> List[CrawledPage]:
+    return await Crawler(config, pdf_parser=pdf_parser).crawl(start_urls)
@@ -0,0 +1,161 @@
+"""
+Single-fetch pipeline stage for the crawler.
+
+Each URL is downloaded exactly once into a ``FetchedPage``; text extraction
+and link extraction both read from that same buffer. PDFs are streamed to a
+temporary file instead, hashed on the way, for the parse stage in
+``src.functions.crawl.pdf``. ``FetchStats`` records what the crawl
+downloaded, how many pages conditional requests and content hashes let it
+skip, and what reusing the buffer saved: links used to come from a second
+GET of every HTML page, which ``requests_saved`` and ``bytes_saved`` count.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import html2text
+import httpx
+from bs4 import BeautifulSoup
+from pydantic import BaseModel, Field
+
+
+class FetchedPage(BaseModel):
+    url: str
+    status_code: int
+    content: bytes = b""
+    content_type: str = ""
+    encoding: str = "utf-8"
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    path: Optional[str] = Field(
+        default=None, description="Temporary file holding the body instead of content"
+    )
+    digest: Optional[str] = Field(
+        default=None, description="sha256 of the body, computed while streaming"
+    )
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+    @property
+    def content_hash(self) -> str:
+        return self.digest or hashlib.sha256(self.content).hexdigest()
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path) if self.path else len(self.content)
+
+    def discard(self):
+        """Remove the temporary file a streamed body was written to."""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def is_pdf(self) -> bool:
+        return "application/pdf" in self.content_type or self.url.lower().endswith(
+            ".pdf"
+        )
+
+    @property
+    def is_html(self) -> bool:
+        return "html" in self.content_type or not self.content_type
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class FetchStats(BaseModel):
+    requests: int = Field(default=0, description="HTTP requests made")
+    bytes_downloaded: int = Field(default=0, description="Response bytes received")
+    requests_saved: int = Field(
+        default=0, description="Link-extraction refetches of HTML pages not made"
+    )
+    bytes_saved: int = Field(
+        default=0, description="Bytes those refetches would have downloaded"
+    )
+    not_modified: int = Field(
+        default=0, description="Conditional requests answered with 304"
+    )
+    unchanged: int = Field(
+        default=0, description="Pages downloaded whose content hash was already indexed"
+    )
+
+    def record(self, page: FetchedPage):
+        self.requests += 1
+        self.bytes_downloaded += page.size
+        if page.is_html and not page.is_pdf:
+            # Links are read from this buffer instead of a second GET
+            self.requests_saved += 1
+            self.bytes_saved += page.size
+
+
+async def fetch_page(
+    client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]] = None
+) -> FetchedPage:
+    """Download ``url``; PDF bodies go to ``page.path``, which the caller discards."""
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code != 304:
+            response.raise_for_status()
+        page = FetchedPage(
+            url=str(response.url),
+            status_code=response.status_code,
+            content_type=response.headers.get("content-type", ""),
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        if page.is_pdf and not page.not_modified:
+            page.path, page.digest = await spool_to_disk(response)
+        else:
+            page.content = await response.aread()
+            page.encoding = response.encoding or "utf-8"
+    return page
+
+
+async def spool_to_disk(response: httpx.Response) -> Tuple[str, str]:
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            async for chunk in response.aiter_bytes():
+                digest.update(chunk)
+                file.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def clean_text(text):
+    # Remove non-ASCII characters and extra whitespace
+    lines = text.splitlines()
+    cleaned_lines = [re.sub(r"[^\x00-\x7F]+", "", line).strip() for line in lines]
+    return "\n".join(filter(None, cleaned_lines))
+
+
+def extract_text(page: FetchedPage) -> str:
+    return clean_text(html2text.html2text(page.text))
+
+
+TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+def extract_title(page: FetchedPage) -> str:
+    match = TITLE_PATTERN.search(page.text)
+    return clean_text(match.group(1)).replace("\n", " ") if match else ""
+
+
+def extract_links(page: FetchedPage) -> List[str]:
+    soup = BeautifulSoup(page.text, "html.parser")
+    links = []
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if href.startswith("#") or href == "/":
+            continue
+        links.append(urljoin(page.url, href))
+    return list(dict.fromkeys(links))
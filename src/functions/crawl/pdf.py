@@ -0,0 +1,194 @@
+"""
+PDF parsing stage for the crawlers.
+
+``fetch_page`` streams PDFs to a temporary file and hashes them on the way.
+``PdfParser`` looks that sha256 up in a SQLite cache of parsed text before
+parsing, so an unchanged PDF is parsed once no matter how many URLs or
+crawls it turns up in, and parses misses in a worker pool so a PDF-heavy
+site is not parsed one file at a time. Identical PDFs parsed concurrently
+share one parse.
+
+The backend is pluggable: ``llamaparse`` (LlamaParse markdown, the default)
+or ``pypdf`` (local text extraction, no network or API key), chosen with
+``PDF_PARSER``. Any ``path -> text`` function works as well.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+PDF_PARSER = os.getenv("PDF_PARSER", "llamaparse")
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "4"))
+# Processes suit the CPU-bound pypdf backend; LlamaParse mostly waits on the network
+PDF_PARSE_PROCESSES = os.getenv("PDF_PARSE_PROCESSES", "false").lower() == "true"
+
+
+class PdfDocument(BaseModel):
+    text: str
+
+
+class PdfStats(BaseModel):
+    parsed: int = 0
+    cache_hits: int = 0
+    failed: int = 0
+    parse_seconds: float = 0.0
+
+
+_llamaparse = None
+
+
+def parse_with_llamaparse(path: str) -> str:
+    global _llamaparse
+    if _llamaparse is None:
+        from llama_parse import LlamaParse
+
+        _llamaparse = LlamaParse(
+            api_key=os.environ["LLAMA_CLOUD_API_KEY"], result_type="markdown"
+        )
+    return "\n".join(document.text for document in _llamaparse.load_data(path))
+
+
+def parse_with_pypdf(path: str) -> str:
+    from pypdf import PdfReader
+
+    return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+PDF_BACKENDS: Dict[str, Callable[[str], str]] = {
+    "llamaparse": parse_with_llamaparse,
+    "pypdf": parse_with_pypdf,
+}
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PdfCache:
+    """Parsed text by (content sha256, backend) in a SQLite file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("PDF_CACHE_PATH", "pdf_cache.db")
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def get(self, digest: str, backend: str) -> Optional[str]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT text FROM pdf_text WHERE digest = ? AND backend = ?",
+                (digest, backend),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, digest: str, backend: str, text: str):
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO pdf_text (digest, backend, text, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (digest, backend, text, time.time()),
+            )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pdf_text (digest TEXT NOT NULL, "
+                "backend TEXT NOT NULL, text TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (digest, backend))"
+            )
+        return self._conn
+
+
+class PdfParser:
+    """Awaitable ``(url, path, digest) -> documents`` used as a crawler's ``pdf_parser``."""
+
+    def __init__(
+        self,
+        backend: Union[str, Callable[[str], str]] = PDF_PARSER,
+        workers: int = PDF_PARSE_WORKERS,
+        processes: bool = PDF_PARSE_PROCESSES,
+        cache: Optional[PdfCache] = None,
+    ):
+        if isinstance(backend, str):
+            self.backend_name, self.backend = backend, PDF_BACKENDS[backend]
+        else:
+            self.backend_name = f"{backend.__module__}.{backend.__qualname__}"
+            self.backend = backend
+        self.workers = workers
+        self.processes = processes
+        self.cache = cache or PdfCache()
+        self.stats = PdfStats()
+        self._executor: Optional[Executor] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(
+        self, url: str, path: str, digest: Optional[str] = None
+    ) -> List[PdfDocument]:
+        digest = digest or await asyncio.to_thread(file_digest, path)
+        text = self.cache.get(digest, self.backend_name)
+        if text is not None:
+            self.stats.cache_hits += 1
+        elif digest in self._in_flight:
+            self.stats.cache_hits += 1
+            text = await asyncio.shield(self._in_flight[digest])
+        else:
+            text = await self._parse(url, path, digest)
+        return [PdfDocument(text=text)] if text else []
+
+    async def _parse(self, url: str, path: str, digest: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[digest] = future
+        started = time.perf_counter()
+        try:
+            text = await asyncio.get_running_loop().run_in_executor(
+                self._pool(), self.backend, path
+            )
+            self.stats.parsed += 1
+            self.cache.put(digest, self.backend_name, text)
+        except Exception as e:
+            # A broken PDF should not fail the crawl; it is retried next crawl
+            print(f"Failed to read PDF {url}: {e}")
+            self.stats.failed += 1
+            text = ""
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self.stats.parse_seconds += time.perf_counter() - started
+            del self._in_flight[digest]
+        future.set_result(text)
+        return text
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            pool = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.cache.close()
+
+
+# Shared by every crawl in the process; the cache and pool start lazily
+pdf_parser = PdfParser()
@@ -0,0 +1,299 @@
+"""
+Durable crawl state backed by a local SQLite file.
+
+Every page the crawler visits is recorded with its depth, content hash,
+ETag / Last-Modified validators, outgoing links and crawl time. The pending
+frontier of a run lives in the same file, so an interrupted crawl resumes
+where it stopped, and later runs revalidate known pages with conditional
+requests instead of downloading them again.
+
+A run stays open until ``finish_run`` is called and only resumes for the
+same start URLs. While a crawler works on a run it renews the run's lease;
+an unfinished run is picked up again only once its lease has lapsed, so two
+overlapping crawls never share a run. Callers mark pages as indexed once
+their content is safely stored; pages fetched but not indexed before a crash
+are fetched again on resume.
+
+Vectors to delete from the index are queued in ``pending_deletions`` and
+stay there until the delete has gone through, so a failed crawl or delete is
+retried by the next run instead of leaking the vectors.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from pydantic import BaseModel, Field
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    start_urls TEXT,
+    heartbeat REAL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    content_hash TEXT,
+    indexed_hash TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    links TEXT,
+    last_crawled REAL,
+    run_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_pages_run_id ON pages (run_id);
+CREATE TABLE IF NOT EXISTS frontier (
+    run_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (run_id, url)
+);
+CREATE TABLE IF NOT EXISTS pending_deletions (
+    source_url TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (source_url, hash)
+);
+"""
+# Columns added to crawl_runs after the first release
+RUN_COLUMNS = {"start_urls": "TEXT", "heartbeat": "REAL"}
+# Seconds without a heartbeat after which an unfinished run counts as abandoned
+RUN_LEASE = float(os.getenv("CRAWL_RUN_LEASE", "120"))
+
+
+class PageRecord(BaseModel):
+    url: str
+    depth: int
+    content_hash: Optional[str] = None
+    indexed_hash: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    links: List[str] = Field(default_factory=list)
+    last_crawled: Optional[float] = None
+
+    @property
+    def is_indexed(self) -> bool:
+        return self.content_hash is not None and self.content_hash == self.indexed_hash
+
+    def conditional_headers(self) -> Dict[str, str]:
+        # Only revalidate content we know made it into the index.
+        if not self.is_indexed:
+            return {}
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CrawlState:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("CRAWL_STATE_PATH", "crawl_state.db")
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {
+            row["name"] for row in self.conn.execute("PRAGMA table_info(crawl_runs)")
+        }
+        with self.conn:
+            for name, column_type in RUN_COLUMNS.items():
+                if name not in columns:
+                    self.conn.execute(
+                        f"ALTER TABLE crawl_runs ADD COLUMN {name} {column_type}"
+                    )
+
+    def close(self):
+        self.conn.close()
+
+    def open_run(self, start_urls: List[str]) -> Tuple[int, bool]:
+        """Return ``(run_id, resumed)``.
+
+        Reuses the newest unfinished run over the same start URLs whose lease
+        has lapsed, and starts a new run otherwise.
+        """
+        key = json.dumps(sorted(set(start_urls)))
+        now = time.time()
+        row = self.conn.execute(
+            """
+            SELECT id FROM crawl_runs
+            WHERE finished_at IS NULL AND start_urls = ? AND heartbeat < ?
+            ORDER BY id DESC LIMIT 1
+            """,
+            (key, now - RUN_LEASE),
+        ).fetchone()
+        with self.conn:
+            if row:
+                # Claim it only if no other crawler renewed the lease meanwhile
+                claimed = self.conn.execute(
+                    "UPDATE crawl_runs SET heartbeat = ? WHERE id = ? AND heartbeat < ?",
+                    (now, row["id"], now - RUN_LEASE),
+                )
+                if claimed.rowcount:
+                    return row["id"], True
+            cursor = self.conn.execute(
+                "INSERT INTO crawl_runs (started_at, start_urls, heartbeat) VALUES (?, ?, ?)",
+                (now, key, now),
+            )
+        return cursor.lastrowid, False
+
+    def renew_run(self, run_id: int):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE crawl_runs SET heartbeat = ? WHERE id = ?", (time.time(), run_id)
+            )
+
+    def run_start_urls(self, run_id: int) -> List[str]:
+        row = self.conn.execute(
+            "SELECT start_urls FROM crawl_runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        return json.loads(row["start_urls"]) if row and row["start_urls"] else []
+
+    def finish_run(self, run_id: int):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE crawl_runs SET finished_at = ? WHERE id = ?",
+                (time.time(), run_id),
+            )
+            self.conn.execute("DELETE FROM frontier WHERE run_id = ?", (run_id,))
+
+    def visited_in_run(self, run_id: int) -> Set[str]:
+        rows = self.conn.execute("SELECT url FROM pages WHERE run_id = ?", (run_id,))
+        return {row["url"] for row in rows}
+
+    def resume_frontier(self, run_id: int) -> List[Tuple[str, int]]:
+        """Pending URLs of a run plus visited pages that never got indexed."""
+        rows = self.conn.execute(
+            """
+            SELECT url, depth FROM frontier WHERE run_id = ?
+            UNION
+            SELECT url, depth FROM pages
+            WHERE run_id = ? AND (indexed_hash IS NULL OR indexed_hash != content_hash)
+            """,
+            (run_id, run_id),
+        )
+        return [(row["url"], row["depth"]) for row in rows]
+
+    def add_to_frontier(self, run_id: int, url: str, depth: int):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO frontier (run_id, url, depth) VALUES (?, ?, ?)",
+                (run_id, url, depth),
+            )
+
+    def remove_from_frontier(self, run_id: int, url: str):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM frontier WHERE run_id = ? AND url = ?", (run_id, url)
+            )
+
+    def get_page(self, url: str) -> Optional[PageRecord]:
+        row = self.conn.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return PageRecord(
+            url=row["url"],
+            depth=row["depth"],
+            content_hash=row["content_hash"],
+            indexed_hash=row["indexed_hash"],
+            etag=row["etag"],
+            last_modified=row["last_modified"],
+            links=json.loads(row["links"] or "[]"),
+            last_crawled=row["last_crawled"],
+        )
+
+    def record_page(
+        self,
+        run_id: int,
+        url: str,
+        depth: int,
+        content_hash: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        links: List[str],
+    ):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO pages
+                    (url, depth, content_hash, etag, last_modified, links, last_crawled, run_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    depth = excluded.depth,
+                    content_hash = excluded.content_hash,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    links = excluded.links,
+                    last_crawled = excluded.last_crawled,
+                    run_id = excluded.run_id
+                """,
+                (
+                    url,
+                    depth,
+                    content_hash,
+                    etag,
+                    last_modified,
+                    json.dumps(links),
+                    time.time(),
+                    run_id,
+                ),
+            )
+
+    def record_not_modified(self, run_id: int, url: str, depth: int):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE pages SET depth = ?, last_crawled = ?, run_id = ? WHERE url = ?",
+                (depth, time.time(), run_id, url),
+            )
+
+    def stale_pages(self, run_id: int, hosts: List[str]) -> List[str]:
+        """Known pages on ``hosts`` that nothing crawled since the run started."""
+        rows = self.conn.execute(
+            """
+            SELECT url FROM pages
+            WHERE run_id IS NOT ? AND (
+                last_crawled IS NULL
+                OR last_crawled < (SELECT started_at FROM crawl_runs WHERE id = ?)
+            )
+            """,
+            (run_id, run_id),
+        )
+        return [row["url"] for row in rows if urlparse(row["url"]).netloc in hosts]
+
+    def delete_pages(self, urls: List[str]):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM pages WHERE url = ?", [(url,) for url in urls]
+            )
+
+    def add_deletions(self, deletions: List[Tuple[str, str]]):
+        """Queue ``(source_url, hash)`` vectors for deletion from the index."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO pending_deletions (source_url, hash) VALUES (?, ?)",
+                deletions,
+            )
+
+    def pending_deletions(self) -> List[Tuple[str, str]]:
+        rows = self.conn.execute("SELECT source_url, hash FROM pending_deletions")
+        return [(row["source_url"], row["hash"]) for row in rows]
+
+    def clear_deletions(self, deletions: List[Tuple[str, str]]):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM pending_deletions WHERE source_url = ? AND hash = ?",
+                deletions,
+            )
+
+    def mark_indexed(self, urls: List[str]):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE pages SET indexed_hash = content_hash WHERE url = ?",
+                [(url,) for url in urls],
+            )
@@ -8,29 +8,46 @@ Copyright (c) 2023-2024 Saurabh Zinjad. All rights reserved | https://github.com
 -----------------------------------------------------------------------
 """
 
+import asyncio
+import hashlib
 import time
 import os
-import re
-import tempfile
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from llama_index.readers.web import SimpleWebPageReader
-from llama_index.core import SimpleDirectoryReader
-from llama_parse import LlamaParse
+from typing import List
+from urllib.parse import urlparse
 from pinecone import Pinecone, ServerlessSpec
-
-# set up parser
-parser = LlamaParse(
-    api_key=os.environ["LLAMA_CLOUD_API_KEY"], result_type="markdown"
-)  # "markdown" and "text" are available
-file_extractor = {".pdf": parser}
+from restack_ai.function import function
+
+from src.functions.crawl.chunk import ChunkConfig, chunk_text
+from src.functions.crawl.dedup import Deduplicator, content_hash
+from src.functions.crawl.engine import CrawlConfig, Crawler
+from src.functions.crawl.pdf import pdf_parser
+from src.functions.crawl.state import CrawlState
+from src.functions.vector.embedding import (
+    EmbeddingCache,
+    LocalEmbedder,
+    PineconeEmbedder,
+)
+from src.functions.vector.ingest import IngestPipeline
+from src.functions.vector.store import LocalVectorStore, PineconeStore
+from src.functions.vector.version import IndexVersion
 
 # Initialize Pinecone and set up index
-visited_urls = set()
 INDEX_NAME = "gov-benefits"
 API_KEY = os.getenv("PINECONE_API_KEY")
-MAX_DOCUMENTS = 96
+NAMESPACE = "ns1"
+MAX_DELETE_IDS = 1000
+NEAR_DUPLICATE_DEDUP = os.getenv("NEAR_DUPLICATE_DEDUP", "false").lower() == "true"
+RECONCILE_VECTORS = os.getenv("RECONCILE_VECTORS", "false").lower() == "true"
+CHUNK_CONFIG = ChunkConfig(
+    max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", "200")),
+    overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "30")),
+)
+# "pinecone" or "local"; local runs need no network when both are local
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")
+EMBEDDER = os.getenv("EMBEDDER", "pinecone")
+# Shared by every request and crawl in the process; opens its file lazily
+embedding_cache = EmbeddingCache()
+local_vector_store = None
 
 
 def initialize_pinecone_index():
@@ -45,137 +62,182 @@ def initialize_pinecone_index():
     return pc
 
 
-def parse_pdf(url):
-    with tempfile.TemporaryDirectory() as temp_dir:
-        pdf_path = os.path.join(temp_dir, "downloaded_file.pdf")
-        try:
-            # Download PDF
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            with open(pdf_path, "wb") as pdf_file:
-                pdf_file.write(response.content)
-
-            # Process PDF with SimpleDirectoryReader
-            documents = SimpleDirectoryReader(
-                input_dir=temp_dir, file_extractor=file_extractor
-            ).load_data([pdf_path])
-            return documents
-        except Exception as e:
-            print(f"Failed to read PDF {url}: {e}")
-            return []
-
-
-def crawl(url, max_depth, current_depth=0):
-    if current_depth > max_depth or url in visited_urls:
-        return []
-
-    print(f"Crawling: {url} at depth {current_depth}")
-    visited_urls.add(url)
-    web_content_list = set()
-
-    # Fetch and clean content using SimpleWebPageReader
-    try:
-        if url.endswith(".pdf"):
-            documents = parse_pdf(url)
-        else:
-            documents = SimpleWebPageReader(html_to_text=True).load_data([url])
-        for doc in documents:
-            if doc.text.strip():
-                cleaned_text = clean_text(doc.text)
-                print(f"Content from {url}: {cleaned_text}")
-                for line in cleaned_text.split("\n"):
-                    web_content_list.add(line)
-    except Exception as e:
-        print(f"Failed to read page {url}: {e}")
-
-    # Parse links and recurse if within the same domain
-    try:
-        soup = BeautifulSoup(requests.get(url).text, "html.parser")
-        all_links_in_page = set(
-            [link["href"] for link in soup.find_all("a", href=True)]
-        )
-        for href in all_links_in_page:
-            if href.startswith("#") or href == "/":
-                continue
-            link = urljoin(url, href)
-            if is_same_domain(url, link) and link not in visited_urls:
-                web_content_list.union(crawl(link, max_depth, current_depth + 1))
-    except requests.RequestException as e:
-        print(f"Error fetching links from {url}: {e}")
-
-    return web_content_list
+def uses_pinecone():
+    return VECTOR_STORE == "pinecone" or EMBEDDER == "pinecone"
 
 
-def is_same_domain(base_url, new_url):
-    return urlparse(base_url).netloc == urlparse(new_url).netloc
+def get_embedder(pc):
+    if EMBEDDER == "local":
+        return LocalEmbedder()
+    return PineconeEmbedder(pc)
 
 
-def clean_text(text):
-    # Remove non-ASCII characters and extra whitespace
-    lines = text.splitlines()
-    cleaned_lines = [re.sub(r"[^\x00-\x7F]+", "", line).strip() for line in lines]
-    return "\n".join(filter(None, cleaned_lines))
+def get_vector_store(pc):
+    global local_vector_store
+    if VECTOR_STORE == "local":
+        if local_vector_store is None:
+            local_vector_store = LocalVectorStore(
+                approximate=os.getenv("LOCAL_VECTOR_STORE_APPROXIMATE") == "true"
+            )
+        return local_vector_store
+    return PineconeStore(pc.Index(INDEX_NAME))
 
 
 def create_vector_embedding(pc, data):
-    embeddings = []
-    for i in range(0, len(data), MAX_DOCUMENTS):
-        embedding = pc.inference.embed(
-            model="multilingual-e5-large",
-            inputs=data[i : i + MAX_DOCUMENTS],
-            parameters={"input_type": "passage", "truncate": "END"},
-        )
-        embeddings.extend(embedding)
-    return embeddings
+    return embedding_cache.embed(get_embedder(pc), data, "passage")
 
 
-def upsert_data(pc, data, embeddings):
-    # Wait for the index to be ready
+def vector_id(source_url, digest):
+    # Stable across crawls, so re-ingesting a page overwrites its vectors.
+    url_key = hashlib.sha256(source_url.encode()).hexdigest()[:16]
+    return f"{url_key}-{digest[:32]}"
+
+
+def wait_for_index(pc):
+    if VECTOR_STORE != "pinecone":
+        return
     while not pc.describe_index(INDEX_NAME).status.get("ready", False):
         time.sleep(1)
 
-    index = pc.Index(INDEX_NAME)
-    vectors = [
-        {"id": f"{time.time()}_{i}", "values": e["values"], "metadata": {"text": d}}
-        for i, (d, e) in enumerate(zip(data, embeddings))
+
+def to_vectors(chunks, embeddings):
+    return [
+        {
+            "id": vector_id(chunk.source_url, content_hash(chunk.text)),
+            "values": e,
+            "metadata": chunk.metadata,
+        }
+        for chunk, e in zip(chunks, embeddings)
     ]
-    index.upsert(vectors=vectors, namespace="ns1")
-    return index
 
 
-def get_matching_embedding(pc, query: str):
-    index = pc.Index(INDEX_NAME)
-    embedding = pc.inference.embed(
-        model="multilingual-e5-large",
-        inputs=[query],
-        parameters={"input_type": "query"},
-    )
-    results = index.query(
-        namespace="ns1",
-        vector=embedding[0].values,
-        top_k=15,
-        include_values=False,
-        include_metadata=True,
-    )
-    return results
+def upsert_data(pc, chunks, embeddings):
+    # Wait for the index to be ready
+    wait_for_index(pc)
+
+    store = get_vector_store(pc)
+    store.upsert(to_vectors(chunks, embeddings), NAMESPACE)
+    return store
 
 
-def web_crawler(start_urls):
-    pc = initialize_pinecone_index()
+def delete_vectors(pc, ids):
+    store = get_vector_store(pc)
+    for i in range(0, len(ids), MAX_DELETE_IDS):
+        store.delete(ids[i : i + MAX_DELETE_IDS], NAMESPACE)
 
-    # Crawling the web and creating embeddings
-    web_crawl_data = []
-    for url in start_urls:
-        web_crawl_data.extend(crawl(url, max_depth=4))
 
-    if web_crawl_data:
-        embeddings = create_vector_embedding(pc, web_crawl_data)
-        upsert_data(pc, web_crawl_data, embeddings)
-    else:
-        print("No data crawled.")
+async def delete_pending_vectors(pc, dedup, state, gone_pages) -> int:
+    """Delete the queued vectors, then release their hashes and page rows.
+
+    Vectors whose text some page carries again are dropped from the queue.
+    Nothing is released unless the delete succeeded; a failed delete stays
+    queued for the next run. Returns the number of vectors deleted.
+    """
+    pending = state.pending_deletions()
+    carried = dedup.carried([digest for _, digest in pending])
+    if carried:
+        state.clear_deletions([d for d in pending if d[1] in carried])
+        pending = [d for d in pending if d[1] not in carried]
+    if pending:
+        ids = [vector_id(url, digest) for url, digest in pending]
+        try:
+            await asyncio.to_thread(delete_vectors, pc, ids)
+        except Exception as e:
+            print(f"Deleting {len(ids)} stale vectors failed, retrying next run: {e}")
+            return 0
+        dedup.forget(digest for _, digest in pending)
+        state.clear_deletions(pending)
+    state.delete_pages(gone_pages)
+    return len(pending)
+
+
+def embed_query(pc, query: str):
+    return embedding_cache.embed(get_embedder(pc), [query], "query")[0]
+
+
+def get_matching_embedding(pc, query: str, store=None):
+    store = store or get_vector_store(pc)
+    results = store.query(embed_query(pc, query), top_k=15, namespace=NAMESPACE)
+    return results
+
+
+@function.defn(name="web_crawler")
+async def web_crawler(start_urls: List[str]):
+    # Pinecone calls block; keep them off the event loop other functions share
+    pc = await asyncio.to_thread(initialize_pinecone_index) if uses_pinecone() else None
+    await asyncio.to_thread(wait_for_index, pc)
+    store = await asyncio.to_thread(get_vector_store, pc)
+
+    state = CrawlState()
+    dedup = Deduplicator(near_duplicates=NEAR_DUPLICATE_DEDUP)
+    crawler = Crawler(CrawlConfig(max_depth=4), pdf_parser=pdf_parser, state=state)
+    pipeline = IngestPipeline(
+        embed=lambda texts: create_vector_embedding(pc, texts),
+        upsert=lambda chunks, embeddings: store.upsert(
+            to_vectors(chunks, embeddings), NAMESPACE
+        ),
+    )
+    changed_urls = []
+
+    # Pages stream from the crawler through dedup into embed/upsert batches
+    async def ingest_page(page):
+        if not page.changed:
+            return
+        changed_urls.append(page.url)
+        page_chunks = chunk_text(page.text, page.url, page.title, CHUNK_CONFIG)
+        kept = set(dedup.filter([c.text for c in page_chunks], source_url=page.url))
+        for chunk in page_chunks:
+            if chunk.text in kept:
+                await pipeline.put(chunk)
+
+    async with pipeline:
+        await crawler.crawl(start_urls, on_page=ingest_page)
+
+    stats = crawler.stats
+    print(
+        f"Fetched {stats.requests} pages ({stats.bytes_downloaded} bytes), "
+        f"saved {stats.requests_saved} requests ({stats.bytes_saved} bytes), "
+        f"{stats.not_modified} not modified, {stats.unchanged} unchanged"
+    )
+    print(f"Deduplication: {dedup.stats}")
+    print(f"Ingestion: {pipeline.stats}")
+    print(f"Embedding cache: {embedding_cache.stats}")
+    print(f"PDF parsing: {pdf_parser.stats}")
+
+    # Pages that vanished from a fully crawled site carry no text any more.
+    # A resumed run only knows which pages failed since it resumed, so it
+    # cannot tell them from gone pages and leaves that to the next run.
+    gone = []
+    if RECONCILE_VECTORS and not crawler.truncated and not crawler.resumed:
+        hosts = [urlparse(url).netloc for url in state.run_start_urls(crawler.run_id)]
+        gone = [
+            url
+            for url in state.stale_pages(crawler.run_id, hosts)
+            if url not in crawler.failed
+        ]
+        dedup.drop_pages(gone)
+    dedup.commit()
+    # A vector goes once no page carries its text, whichever page stored it
+    if RECONCILE_VECTORS:
+        state.add_deletions(dedup.orphans())
+    deleted = await delete_pending_vectors(pc, dedup, state, gone)
+    if RECONCILE_VECTORS or deleted:
+        print(
+            f"Reconciliation: {len(gone)} pages gone, {deleted} stale vectors deleted"
+        )
+
+    # Cached recommendations built on the old index stop matching
+    if pipeline.stats.upsert_batches or deleted:
+        index_version = IndexVersion()
+        print(f"Index version bumped to {index_version.bump()}")
+        index_version.close()
+    dedup.close()
+    state.mark_indexed(changed_urls)
+    state.finish_run(crawler.run_id)
+    state.close()
 
     query = "What kind of benefits veterns, students, parents, citizen have from government?"
-    results = get_matching_embedding(pc, query)
+    results = await asyncio.to_thread(get_matching_embedding, pc, query, store)
     for match in results["matches"]:
         print(match["metadata"]["text"])
 
@@ -204,4 +266,4 @@ start_urls = [
 ]
 
 if __name__ == "__main__":
-    web_crawler(start_urls)
+    asyncio.run(web_crawler(start_urls))
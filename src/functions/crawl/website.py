@@ -0,0 +1,32 @@
+"""
+Single-page fetch used by ``hn_workflow`` to read the site behind a story.
+
+Unlike ``web_crawler`` it does not follow links or touch the crawl state: it
+downloads one URL and returns its text (markdown for HTML, parsed text for
+PDFs).
+"""
+
+from restack_ai.function import FunctionFailure, function, log
+
+from src.functions.crawl.engine import CrawlConfig, create_http_client
+from src.functions.crawl.fetch import extract_text, fetch_page
+from src.functions.crawl.pdf import pdf_parser
+
+
+@function.defn(name="crawl_website")
+async def crawl_website(url: str) -> str:
+    try:
+        async with create_http_client(CrawlConfig()) as client:
+            page = await fetch_page(client, url)
+        if page.is_pdf:
+            try:
+                documents = await pdf_parser(url, page.path, page.digest)
+            finally:
+                page.discard()
+            return "\n".join(document.text for document in documents)
+        if page.is_html:
+            return extract_text(page)
+        return page.text
+    except Exception as e:
+        log.error("crawl_website failed", extra={"url": url, "error": str(e)})
+        raise FunctionFailure(f"Failed to crawl {url}: {e}", non_retryable=True)
@@ -1,5 +1,18 @@
+from typing import List
+
 from pydantic import BaseModel, Field
 
 class HnSearchInput(BaseModel):
     query: str = Field(default=None, description="The query for search")
-    count: int = Field(default=5, description="The number of results to return")
\ No newline at end of file
+    count: int = Field(default=5, description="The number of results to return")
+
+
+# Fields of an Algolia hit that prompts actually use
+HN_STORY_FIELDS = ("title", "url", "author", "points", "num_comments", "created_at")
+
+
+def trim_hn_results(data: dict) -> List[dict]:
+    return [
+        {field: hit[field] for field in HN_STORY_FIELDS if hit.get(field) is not None}
+        for hit in data.get("hits", [])
+    ]
@@ -1,18 +1,107 @@
-import requests
+"""
+Hacker News search through the Algolia API.
+
+Requests share one pooled ``httpx.AsyncClient`` with timeouts. Results are
+cached for ``HN_SEARCH_CACHE_TTL`` seconds per (query, count), and identical
+searches that arrive while one is in flight wait for it instead of calling
+Algolia again. Timeouts, connection errors, 429s and 5xx responses are
+retried with exponential backoff and full jitter, honouring ``Retry-After``.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
 from restack_ai.function import function, log
+
 from src.functions.hn.schema import HnSearchInput
+from src.functions.retry import backoff_delay
+
+HN_SEARCH_URL = "https://hn.algolia.com/api/v1/search_by_date"
+HN_SEARCH_CACHE_TTL = float(os.getenv("HN_SEARCH_CACHE_TTL", "60"))
+HN_SEARCH_CACHE_SIZE = 256
+MAX_RETRIES = 3
+BASE_DELAY = 0.5
+
+http_client: Optional[httpx.AsyncClient] = None
+results_cache: "OrderedDict[Tuple[str, int], Tuple[float, dict]]" = OrderedDict()
+in_flight: Dict[Tuple[str, int], asyncio.Future] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+    return http_client
+
+
+async def fetch_stories(query: Optional[str], count: int) -> dict:
+    params = {
+        "tags": "show_hn",
+        "query": query or "",
+        "hitsPerPage": count,
+        "numericFilters": "points>2",
+    }
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = await get_http_client().get(HN_SEARCH_URL, params=params)
+            if response.status_code != 429 and response.status_code < 500:
+                response.raise_for_status()
+                return response.json()
+            error = httpx.HTTPStatusError(
+                f"Algolia returned {response.status_code}",
+                request=response.request,
+                response=response,
+            )
+        except httpx.TransportError as e:
+            error = e
+        if attempt == MAX_RETRIES:
+            raise error
+        delay = backoff_delay(error, attempt, BASE_DELAY)
+        log.warning(f"hn_search attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+async def search_stories(query: Optional[str], count: int) -> dict:
+    key = (query or "", count)
+    cached = results_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        results_cache.move_to_end(key)
+        return cached[1]
+    # Identical searches already running share the one upstream call
+    if key in in_flight:
+        return await asyncio.shield(in_flight[key])
+
+    future = asyncio.get_running_loop().create_future()
+    in_flight[key] = future
+    try:
+        data = await fetch_stories(query, count)
+        results_cache[key] = (time.monotonic() + HN_SEARCH_CACHE_TTL, data)
+        while len(results_cache) > HN_SEARCH_CACHE_SIZE:
+            results_cache.popitem(last=False)
+        future.set_result(data)
+        return data
+    except BaseException as e:
+        future.set_exception(e)
+        # Mark retrieved so an unawaited failure does not log a warning
+        future.exception()
+        raise
+    finally:
+        del in_flight[key]
+
 
 @function.defn(name="hn_search")
 async def hn_search(input: HnSearchInput):
     try:
-        # Fetch the latest stories IDs
-        response = requests.get(
-            f"https://hn.algolia.com/api/v1/search_by_date?tags=show_hn&query={input.query}&hitsPerPage={input.count}&numericFilters=points>2"
-        )
-        data = response.json()
-
+        data = await search_stories(input.query, input.count)
         log.info("hnSearch", extra={"data": data})
         return data
     except Exception as error:
         log.error("hn_search function failed", error=error)
-        raise error
\ No newline at end of file
+        raise error
@@ -0,0 +1,151 @@
+"""
+Shared async Together client for the LLM functions.
+
+Every ``llm_chat`` and ``llm_summarize`` call in the service process goes
+through one ``AsyncTogether`` client, so connections are reused, and through
+one ``AdaptiveLimiter``, which bounds concurrent completions. In adaptive
+mode the limit behaves like TCP congestion control: each success adds
+about one slot per round of calls and each rate-limit response halves it
+(at most once per back-off window), so the service settles just below the
+provider's limit instead of hammering it. Rate-limited and failed calls are
+retried with exponential backoff and full jitter, honouring ``Retry-After``.
+
+``TOGETHER_BASE_URL`` points the client at another OpenAI-compatible server,
+such as the fake one in ``benchmarks/llm_benchmark.py``.
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from together import AsyncTogether
+
+from src.functions.retry import backoff_delay, status_code
+
+CHAT_MODEL = "meta-llama/Llama-3.2-11B-Vision-Instruct-Turbo"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_ADAPTIVE_CONCURRENCY = os.getenv("LLM_ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        adaptive: bool = LLM_ADAPTIVE_CONCURRENCY,
+        max_retries: int = 6,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._changed: Optional[asyncio.Event] = None
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_retries + 1):
+            error = None
+            await self._acquire()
+            # Released even when the caller is cancelled mid-request
+            try:
+                result = await fn()
+            except Exception as e:
+                error = e
+            finally:
+                self._release()
+            if error is None:
+                if self.adaptive and self.limit < self.max_concurrency:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                return result
+            status = status_code(error)
+            if attempt == self.max_retries or not (
+                status in RETRYABLE_STATUS or status is None and _is_transient(error)
+            ):
+                raise error
+            self.retries += 1
+            delay = backoff_delay(error, attempt, self.base_delay, self.max_delay)
+            if status == 429:
+                self._throttled(delay)
+            await asyncio.sleep(delay)
+
+    def _throttled(self, delay: float):
+        now = time.monotonic()
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, now + delay)
+        # One burst of 429s is one congestion signal, not one per request
+        if self.adaptive and now - self._last_decrease > delay:
+            self.limit = max(1.0, self.limit / 2)
+            self._last_decrease = now
+
+    async def _acquire(self):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        while True:
+            wait = self._paused_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            elif self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            else:
+                self._changed.clear()
+                await self._changed.wait()
+
+    def _release(self):
+        self.in_flight -= 1
+        self._changed.set()
+
+
+def _is_transient(error: Exception) -> bool:
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or type(
+        error
+    ).__name__ in ("APIConnectionError", "APITimeoutError", "Timeout")
+
+
+llm_client: Optional[AsyncTogether] = None
+llm_limiter = AdaptiveLimiter()
+
+
+def get_llm_client() -> AsyncTogether:
+    global llm_client
+    if llm_client is None:
+        # Retries are the limiter's job, so it sees every 429
+        llm_client = AsyncTogether(
+            api_key=os.getenv("TOGETHER_API_KEY"),
+            base_url=os.getenv("TOGETHER_BASE_URL"),
+            max_retries=0,
+        )
+    return llm_client
+
+
+async def chat_completion(
+    system_prompt: str,
+    user_prompt: str,
+    client: Optional[AsyncTogether] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+) -> str:
+    client = client or get_llm_client()
+    limiter = limiter or llm_limiter
+
+    async def complete():
+        response = await client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        )
+        return response.choices[0].message.content
+
+    return await limiter.call(complete)
@@ -0,0 +1,130 @@
+"""
+Token-budgeted map-reduce summarization.
+
+Inputs that fit in ``max_input_tokens`` go to the LLM in one call with the
+caller's prompt. Larger inputs are cut along section and sentence
+boundaries (the same chunker the crawler uses), the pieces are packed into
+parts that fill the budget, the parts are summarized concurrently, and the
+partial summaries are merged in rounds, each round packing as many
+summaries as fit the budget into one call, until a single input fits. That last input gets the caller's prompt.
+
+Token counts are approximated as words plus punctuation marks (see
+``src.functions.crawl.chunk``), and are logged per call as ``tokens_in`` and
+``tokens_out`` along with the step name.
+"""
+
+import asyncio
+import os
+from typing import List
+
+from pydantic import BaseModel, Field
+from restack_ai.function import FunctionFailure, function, log
+
+from src.functions.crawl.chunk import TOKEN_PATTERN, ChunkConfig, chunk_text
+from src.functions.llm.client import chat_completion
+
+MAX_INPUT_TOKENS = int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "6000"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+MAX_REDUCE_LEVELS = 5
+MAP_PROMPT = "Summarize this part of a larger document. Keep names, numbers and links: {content}"
+REDUCE_PROMPT = "Merge these partial summaries of one document into a single summary: {content}"
+
+
+class SummarizeInput(BaseModel):
+    system_prompt: str
+    prompt: str = Field(
+        default="Summarize the following content: {content}",
+        description="Prompt for the final call; {content} is replaced by the input",
+    )
+    content: str
+    max_input_tokens: int = Field(
+        default=MAX_INPUT_TOKENS, description="Token budget of the content per call"
+    )
+
+
+def count_tokens(text: str) -> int:
+    return sum(1 for _ in TOKEN_PATTERN.finditer(text))
+
+
+def split_budget(text: str, max_tokens: int) -> List[str]:
+    """Cut ``text`` into parts of at most ``max_tokens``.
+
+    The chunker starts a new chunk at every heading, so its chunks are packed
+    back together; otherwise every short section would cost its own call.
+    """
+    config = ChunkConfig(max_tokens=max_tokens, overlap_tokens=0, min_tokens=1)
+    chunks = chunk_text(text, source_url="", config=config)
+    return pack([chunk.text for chunk in chunks], max_tokens)
+
+
+def pack(summaries: List[str], max_tokens: int) -> List[str]:
+    """Group consecutive summaries into inputs of at most ``max_tokens``."""
+    groups, current, size = [], [], 0
+    for summary in summaries:
+        tokens = count_tokens(summary)
+        if current and size + tokens > max_tokens:
+            groups.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(summary)
+        size += tokens
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+class Summarizer:
+    def __init__(self, system_prompt: str, max_input_tokens: int):
+        self.system_prompt = system_prompt
+        self.max_input_tokens = max_input_tokens
+        self.slots = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+    async def complete(self, step: str, prompt: str, content: str) -> str:
+        async with self.slots:
+            result = await chat_completion(
+                self.system_prompt, prompt.replace("{content}", content)
+            )
+        log.info(
+            "llm_summarize step",
+            extra={
+                "step": step,
+                "tokens_in": count_tokens(content),
+                "tokens_out": count_tokens(result),
+            },
+        )
+        return result
+
+    async def run(self, prompt: str, content: str) -> str:
+        if count_tokens(content) <= self.max_input_tokens:
+            return await self.complete("single", prompt, content)
+        parts = split_budget(content, self.max_input_tokens)
+        summaries = await asyncio.gather(
+            *(self.complete("map", MAP_PROMPT, part) for part in parts)
+        )
+        for level in range(1, MAX_REDUCE_LEVELS + 1):
+            if count_tokens("\n\n".join(summaries)) <= self.max_input_tokens:
+                break
+            groups = pack(summaries, self.max_input_tokens)
+            summaries = await asyncio.gather(
+                *(self.complete(f"reduce-{level}", REDUCE_PROMPT, g) for g in groups)
+            )
+        combined = "\n\n".join(summaries)
+        if count_tokens(combined) > self.max_input_tokens:
+            # Summaries stopped shrinking; keep what fits rather than overflow
+            combined = split_budget(combined, self.max_input_tokens)[0]
+        return await self.complete("final", prompt, combined)
+
+
+@function.defn(name="llm_summarize")
+async def llm_summarize(input: SummarizeInput):
+    api_key = os.getenv("TOGETHER_API_KEY")
+    if not api_key:
+        log.error("TOGETHER_API_KEY environment variable is not set.")
+        raise FunctionFailure(
+            "TOGETHER_API_KEY environment variable is required.", non_retryable=True
+        )
+    try:
+        summarizer = Summarizer(input.system_prompt, input.max_input_tokens)
+        return await summarizer.run(input.prompt, input.content)
+    except Exception as e:
+        log.error(f"Error summarizing content: {e}")
+        raise FunctionFailure(f"Error summarizing content: {e}", non_retryable=True)
@@ -0,0 +1,43 @@
+"""
+Retry helpers shared by the clients of rate-limited HTTP APIs (Pinecone,
+Together, MailerSend, Algolia).
+
+``backoff_delay`` is exponential backoff with full jitter. For a 429 it is
+never shorter than the server's ``Retry-After``, or ``base_delay`` when the
+response has none. Which errors to retry, and whether a 429 pauses other
+workers, is left to the caller.
+"""
+
+import random
+from typing import Optional
+
+
+def status_code(error: Exception) -> Optional[int]:
+    for attr in ("status", "status_code", "http_status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(error, "headers", None) or getattr(
+        getattr(error, "response", None), "headers", None
+    )
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(
+    error: Exception, attempt: int, base_delay: float, max_delay: float = 30.0
+) -> float:
+    """Seconds to wait after failed ``attempt`` (counted from 0)."""
+    delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+    if status_code(error) == 429:
+        delay = max(delay, retry_after(error) or base_delay)
+    return delay
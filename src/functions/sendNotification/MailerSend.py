@@ -1,68 +1,87 @@
+from typing import List
+
+from pydantic import BaseModel, Field
 from restack_ai.function import function, log
-from mailersend import emails
 
-# Initialize MailerSend email client
-mailer = emails.NewEmail()
+from src.functions.sendNotification.dispatcher import (
+    MAILERSEND_FROM_EMAIL,
+    MAILERSEND_FROM_NAME,
+    Notification,
+    NotificationDispatcher,
+)
 
-@function.defn(name="send_email")
-def send_email(to_email: str, to_name: str, subject: str, html_content: str, text_content: str, from_email: str = "your@domain.com", from_name: str = "Your Name") -> str:
-    """
-    Sends an email with the specified details using MailerSend.
-    
-    Args:
-        to_email (str): Recipient's email address.
-        to_name (str): Recipient's name.
-        subject (str): Subject of the email.
-        html_content (str): HTML content of the email.
-        text_content (str): Plain text content of the email.
-        from_email (str): Sender's email address.
-        from_name (str): Sender's name.
-        
-    Returns:
-        str: Status message of the email sending operation.
-    """
-    try:
-        # Prepare the mail body
-        mail_body = {}
-        
-        # Set sender details
-        mail_from = {
-            "name": from_name,
-            "email": from_email,
-        }
-        mailer.set_mail_from(mail_from, mail_body)
 
-        # Set recipient details
-        recipients = [
-            {
-                "name": to_name,
-                "email": to_email,
-            }
-        ]
-        mailer.set_mail_to(recipients, mail_body)
+class Recipient(BaseModel):
+    email: str
+    name: str = ""
 
-        # Set email subject and content
-        mailer.set_subject(subject, mail_body)
-        mailer.set_html_content(html_content, mail_body)
-        mailer.set_plaintext_content(text_content, mail_body)
 
-        # Optional: Set reply-to address
-        reply_to = {
-            "name": from_name,
-            "email": from_email,
-        }
-        mailer.set_reply_to(reply_to, mail_body)
+class DigestInput(BaseModel):
+    recipients: List[Recipient]
+    subject: str
+    html_content: str
+    text_content: str
+    from_email: str = Field(default=MAILERSEND_FROM_EMAIL, description="Sender address")
+    from_name: str = Field(default=MAILERSEND_FROM_NAME, description="Sender name")
+    idempotency_key: str = Field(
+        default="", description="Per-run key; each recipient's key is derived from it"
+    )
 
-        # Send the email and log the response
-        response = mailer.send(mail_body)
-        log.info("send_email", extra={"status": "Email sent successfully", "to_email": to_email, "subject": subject})
 
-        return response
+@function.defn(name="send_email")
+async def send_email(input: Notification) -> str:
+    """
+    Sends one email through MailerSend.
 
-    except Exception as e:
-        # Log any exceptions and return an error message
-        log.error("send_email function failed", extra={"error": str(e), "to_email": to_email, "subject": subject})
-        return f"Error occurred while sending email: {e}"
+    Returns:
+        str: Status message of the email sending operation.
+    """
+    async with NotificationDispatcher() as dispatcher:
+        await dispatcher.put(input)
+    stats = dispatcher.stats
+    if stats.failed:
+        return f"Error occurred while sending email to {input.to_email}"
+    if stats.duplicates:
+        log.info(
+            "send_email", extra={"status": "Already sent", "to_email": input.to_email}
+        )
+        return "Email already sent"
+    log.info(
+        "send_email",
+        extra={
+            "status": "Email sent successfully",
+            "to_email": input.to_email,
+            "subject": input.subject,
+        },
+    )
+    return "Email sent successfully"
 
-send_email("kshah57@asu.edu", "Keval", "testemail", "hi", "hi", "keval.arhan@gmail.com", "test")
 
+@function.defn(name="send_digest")
+async def send_digest(input: DigestInput) -> dict:
+    """
+    Sends the same email to many recipients with MailerSend bulk requests.
+
+    Returns:
+        dict: Dispatcher counters (sent, duplicates, failed, requests, ...).
+    """
+    async with NotificationDispatcher() as dispatcher:
+        for recipient in input.recipients:
+            await dispatcher.put(
+                Notification(
+                    to_email=recipient.email,
+                    to_name=recipient.name,
+                    subject=input.subject,
+                    html_content=input.html_content,
+                    text_content=input.text_content,
+                    from_email=input.from_email,
+                    from_name=input.from_name,
+                    idempotency_key=(
+                        f"{input.idempotency_key}:{recipient.email.lower()}"
+                        if input.idempotency_key
+                        else None
+                    ),
+                )
+            )
+    log.info("send_digest", extra=dispatcher.stats.model_dump())
+    return dispatcher.stats.model_dump()
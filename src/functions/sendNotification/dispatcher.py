@@ -0,0 +1,370 @@
+"""
+Queued, batching email dispatcher on the MailerSend HTTP API.
+
+Notifications are ``put`` on a bounded queue and sent by a fixed number of
+workers over one pooled ``httpx.AsyncClient``. Each worker takes whatever is
+waiting, up to ``batch_size``: a lone notification goes to ``/email`` and
+several go to ``/bulk-email`` in one request, so a digest to many recipients
+costs a handful of requests instead of one per recipient.
+
+Every notification has an idempotency key, derived from the recipient,
+subject and body unless one is given. Keys already sent (recorded in a
+SQLite ledger) or being sent are skipped, so a retried workflow does not
+email anyone twice. A ``/bulk-email`` response only means the job was
+queued, so its keys are recorded once the bulk status endpoint reports the
+job completed, leaving out the messages it rejected or suppressed.
+
+Rate-limit and server errors are retried with exponential backoff and full
+jitter, honouring ``Retry-After``. Of the transport errors only those raised
+before the request went out (connecting, waiting for a pooled connection)
+are retried: after a read timeout the email may have been sent already.
+
+``MAILERSEND_API_URL`` points the dispatcher at another server, such as the
+fake one in ``benchmarks/notification_benchmark.py``.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+
+import httpx
+from pydantic import BaseModel, Field
+from restack_ai.function import log
+
+from src.functions.retry import backoff_delay, status_code
+
+MAILERSEND_API_URL = os.getenv("MAILERSEND_API_URL", "https://api.mailersend.com/v1")
+MAILERSEND_FROM_EMAIL = os.getenv("MAILERSEND_FROM_EMAIL", "your@domain.com")
+MAILERSEND_FROM_NAME = os.getenv("MAILERSEND_FROM_NAME", "Your Name")
+# MailerSend accepts at most 500 messages per bulk request
+MAX_BULK_MESSAGES = 500
+# Bulk job states that are not final yet
+BULK_PENDING_STATES = {"queued", "scheduled", "processing"}
+# Bulk status errors are keyed like "message.3.to.0.email"
+BULK_MESSAGE_INDEX = re.compile(r"message\.(\d+)")
+# Transport errors raised before the request reached the server
+SAFE_TO_RETRY = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class Notification(BaseModel):
+    to_email: str
+    to_name: str = ""
+    subject: str
+    html_content: str
+    text_content: str
+    from_email: str = Field(default=MAILERSEND_FROM_EMAIL, description="Sender address")
+    from_name: str = Field(default=MAILERSEND_FROM_NAME, description="Sender name")
+    idempotency_key: Optional[str] = Field(
+        default=None, description="Sends with a key already sent are skipped"
+    )
+
+    @property
+    def key(self) -> str:
+        if self.idempotency_key:
+            return self.idempotency_key
+        fields = [self.to_email.lower(), self.subject, self.html_content]
+        fields.append(self.text_content)
+        return hashlib.sha256("\0".join(fields).encode()).hexdigest()
+
+    def mail_body(self) -> dict:
+        sender = {"email": self.from_email, "name": self.from_name}
+        return {
+            "from": sender,
+            "to": [{"email": self.to_email, "name": self.to_name}],
+            "reply_to": sender,
+            "subject": self.subject,
+            "html": self.html_content,
+            "text": self.text_content,
+        }
+
+
+class NotificationConfig(BaseModel):
+    concurrency: int = Field(
+        default=int(os.getenv("NOTIFY_CONCURRENCY", "4")),
+        description="Concurrent requests to MailerSend",
+    )
+    batch_size: int = Field(
+        default=MAX_BULK_MESSAGES, description="Notifications per bulk request"
+    )
+    queue_size: int = Field(
+        default=1000, description="Notifications buffered before put() waits"
+    )
+    timeout: float = Field(default=10.0, description="Per-request timeout in seconds")
+    max_retries: int = Field(default=5, description="Retries per request before failing")
+    base_delay: float = Field(default=0.5, description="First retry delay in seconds")
+    max_delay: float = Field(default=30.0, description="Upper bound of a retry delay")
+    status_interval: float = Field(
+        default=1.0, description="Seconds between bulk status checks"
+    )
+    status_timeout: float = Field(
+        default=60.0, description="How long to wait for a bulk job to complete"
+    )
+
+
+class NotificationStats(BaseModel):
+    queued: int = 0
+    sent: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    # Queued by a bulk request that had not completed within status_timeout
+    unconfirmed: int = 0
+    requests: int = 0
+    bulk_requests: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+
+
+class NotificationLedger:
+    """Idempotency keys of sent notifications in a SQLite file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("NOTIFICATION_LEDGER_PATH", "notifications.db")
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def sent(self, keys: List[str]) -> Set[str]:
+        found = set()
+        with self._lock:
+            db = self._db()
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows = db.execute(
+                    "SELECT key FROM sent_notifications WHERE key IN (%s)"
+                    % ",".join("?" * len(batch)),
+                    batch,
+                )
+                found.update(key for (key,) in rows)
+        return found
+
+    def record(self, keys: Iterable[str]):
+        now = time.time()
+        with self._lock, self._db() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO sent_notifications (key, sent_at) VALUES (?, ?)",
+                [(key, now) for key in keys],
+            )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sent_notifications "
+                "(key TEXT PRIMARY KEY, sent_at REAL NOT NULL)"
+            )
+        return self._conn
+
+
+def create_mailersend_client(config: NotificationConfig) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=config.concurrency,
+        max_keepalive_connections=config.concurrency,
+    )
+    return httpx.AsyncClient(
+        base_url=MAILERSEND_API_URL,
+        headers={"Authorization": f"Bearer {os.getenv('MAILERSEND_API_KEY', '')}"},
+        timeout=config.timeout,
+        limits=limits,
+    )
+
+
+class NotificationDispatcher:
+    def __init__(
+        self,
+        config: Optional[NotificationConfig] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        ledger: Optional[NotificationLedger] = None,
+    ):
+        self.config = config or NotificationConfig()
+        self.client = client
+        self.ledger = ledger or NotificationLedger()
+        self.stats = NotificationStats()
+        self.failed: List[Notification] = []
+        self.unconfirmed: List[Notification] = []
+        self._owns_client = client is None
+        self._owns_ledger = ledger is None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sending: Set[str] = set()
+        self._paused_until = 0.0
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            await self._release()
+
+    def start(self):
+        if self.client is None:
+            self.client = create_mailersend_client(self.config)
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.config.concurrency)
+        ]
+
+    async def put(self, notification: Notification):
+        self.stats.queued += 1
+        await self._queue.put(notification)
+
+    async def close(self) -> NotificationStats:
+        for _ in self._workers:
+            await self._queue.put(None)
+        await asyncio.gather(*self._workers)
+        await self._release()
+        return self.stats
+
+    async def _release(self):
+        if self._owns_client and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        if self._owns_ledger:
+            self.ledger.close()
+
+    async def _worker(self):
+        while True:
+            notification = await self._queue.get()
+            if notification is None:
+                return
+            batch = [notification]
+            stopping = False
+            while len(batch) < self.config.batch_size and not self._queue.empty():
+                notification = self._queue.get_nowait()
+                if notification is None:
+                    stopping = True
+                    break
+                batch.append(notification)
+            await self._send(batch)
+            if stopping:
+                return
+
+    async def _send(self, batch: List[Notification]):
+        keys = [notification.key for notification in batch]
+        already_sent = self.ledger.sent(keys)
+        fresh = {}
+        for key, notification in zip(keys, batch):
+            if key in already_sent or key in self._sending or key in fresh:
+                self.stats.duplicates += 1
+            else:
+                fresh[key] = notification
+        if not fresh:
+            return
+        self._sending.update(fresh)
+        bodies = [notification.mail_body() for notification in fresh.values()]
+        try:
+            if len(bodies) == 1:
+                await self._request("POST", "/email", bodies[0])
+                rejected = set()
+            else:
+                response = await self._request("POST", "/bulk-email", bodies)
+                self.stats.bulk_requests += 1
+                bulk_email_id = response.json()["bulk_email_id"]
+                rejected = await self._bulk_rejections(bulk_email_id)
+        except Exception as e:
+            log.error(
+                "Notification batch failed",
+                extra={"error": str(e), "notifications": len(fresh)},
+            )
+            self.stats.failed += len(fresh)
+            self.failed.extend(fresh.values())
+            return
+        finally:
+            self._sending.difference_update(fresh)
+        if rejected is None:
+            # Queued but not confirmed: not recorded, and not offered for a resend
+            self.stats.unconfirmed += len(fresh)
+            self.unconfirmed.extend(fresh.values())
+            return
+        sent = [key for i, key in enumerate(fresh) if i not in rejected]
+        self.ledger.record(sent)
+        self.stats.sent += len(sent)
+        for i, notification in enumerate(fresh.values()):
+            if i in rejected:
+                self.stats.failed += 1
+                self.failed.append(notification)
+
+    async def _bulk_rejections(self, bulk_email_id: str) -> Optional[Set[int]]:
+        """Indexes of the bulk request's messages that MailerSend did not send.
+
+        None if the job has not completed within ``status_timeout``.
+        """
+        deadline = time.monotonic() + self.config.status_timeout
+        while True:
+            try:
+                response = await self._request(
+                    "GET", f"/bulk-email/{bulk_email_id}", idempotent=True
+                )
+            except Exception as e:
+                log.error(
+                    "Bulk email status check failed",
+                    extra={"error": str(e), "bulk_email_id": bulk_email_id},
+                )
+                return None
+            data = response.json().get("data") or {}
+            if data.get("state") not in BULK_PENDING_STATES:
+                break
+            if time.monotonic() >= deadline:
+                log.warning(
+                    "Bulk email not completed in time",
+                    extra={
+                        "bulk_email_id": bulk_email_id,
+                        "state": data.get("state"),
+                    },
+                )
+                return None
+            await asyncio.sleep(self.config.status_interval)
+        rejected = set()
+        for field in ("validation_errors", "suppressed_recipients"):
+            for name in data.get(field) or {}:
+                match = BULK_MESSAGE_INDEX.match(name)
+                if match:
+                    rejected.add(int(match.group(1)))
+        return rejected
+
+    async def _request(
+        self, method: str, path: str, payload=None, idempotent: bool = False
+    ):
+        for attempt in range(self.config.max_retries + 1):
+            wait = self._paused_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                self.stats.requests += 1
+                response = await self.client.request(method, path, json=payload)
+                response.raise_for_status()
+                return response
+            except (httpx.HTTPStatusError, httpx.TransportError) as e:
+                status = status_code(e)
+                if status is None:
+                    retryable = idempotent or isinstance(e, SAFE_TO_RETRY)
+                else:
+                    retryable = status == 429 or status >= 500
+                if attempt == self.config.max_retries or not retryable:
+                    raise
+                self.stats.retries += 1
+                delay = backoff_delay(
+                    e, attempt, self.config.base_delay, self.config.max_delay
+                )
+                if status == 429:
+                    # One account-wide limit, so every worker backs off together
+                    self.stats.rate_limited += 1
+                    self._paused_until = max(
+                        self._paused_until, time.monotonic() + delay
+                    )
+                await asyncio.sleep(delay)
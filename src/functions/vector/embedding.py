@@ -0,0 +1,176 @@
+"""
+Embedding models and a two-tier embedding cache.
+
+``EmbeddingCache.embed`` looks every text up by (model, input_type, text
+hash), first in an in-process LRU and then in a SQLite file of float32
+blobs, and only sends the misses to the embedder. Embedders are plain
+objects with a ``model`` name and an ``embed(texts, input_type)`` method, so
+``LocalEmbedder`` can stand in for Pinecone inference in tests and offline
+runs.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+EMBED_MODEL = "multilingual-e5-large"
+EMBED_DIMENSION = 1024
+MAX_DOCUMENTS = 96
+
+
+class PineconeEmbedder:
+    def __init__(self, pc, model: str = EMBED_MODEL):
+        self.pc = pc
+        self.model = model
+
+    def embed(self, texts: List[str], input_type: str) -> List[List[float]]:
+        parameters = {"input_type": input_type}
+        if input_type == "passage":
+            parameters["truncate"] = "END"
+        embeddings = self.pc.inference.embed(
+            model=self.model, inputs=texts, parameters=parameters
+        )
+        return [e["values"] for e in embeddings]
+
+
+class LocalEmbedder:
+    """Deterministic hashed bag-of-words vectors; no network, no model."""
+
+    def __init__(self, dimension: int = EMBED_DIMENSION):
+        self.model = f"local-hash-{dimension}"
+        self.dimension = dimension
+        self.calls = 0
+
+    def embed(self, texts: List[str], input_type: str) -> List[List[float]]:
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dimension
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+                slot = int.from_bytes(digest[:4], "big") % self.dimension
+                vector[slot] += 1.0 if digest[4] & 1 else -1.0
+            norm = sum(v * v for v in vector) ** 0.5 or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+
+class EmbeddingCacheStats(BaseModel):
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    embed_calls: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+def cache_key(model: str, input_type: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{input_type}\0{text}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_items: int = 10000,
+        batch_size: int = MAX_DOCUMENTS,
+        persist: bool = True,
+    ):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+        self.max_memory_items = max_memory_items
+        self.batch_size = batch_size
+        self.persist = persist
+        self.stats = EmbeddingCacheStats()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def embed(self, embedder, texts: List[str], input_type: str) -> List[List[float]]:
+        keys = [cache_key(embedder.model, input_type, text) for text in texts]
+        found = self._lookup(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        missing_keys = list(missing)
+        for i in range(0, len(missing_keys), self.batch_size):
+            batch = missing_keys[i : i + self.batch_size]
+            vectors = embedder.embed([missing[key] for key in batch], input_type)
+            self.stats.embed_calls += 1
+            self._store(dict(zip(batch, vectors)))
+            found.update(zip(batch, vectors))
+        return [found[key] for key in keys]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.stats.memory_hits += 1
+            pending = [key for key in dict.fromkeys(keys) if key not in found]
+            if self.persist and pending:
+                db = self._db()
+                for i in range(0, len(pending), 500):
+                    batch = pending[i : i + 500]
+                    rows = db.execute(
+                        "SELECT key, vector FROM embeddings WHERE key IN (%s)"
+                        % ",".join("?" * len(batch)),
+                        batch,
+                    )
+                    for key, blob in rows:
+                        vector = array("f")
+                        vector.frombytes(blob)
+                        found[key] = vector.tolist()
+                        self._remember(key, found[key])
+                        self.stats.disk_hits += 1
+            self.stats.misses += sum(1 for key in pending if key not in found)
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            if self.persist:
+                now = time.time()
+                with self._db() as db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                        [
+                            (key, array("f", vector).tobytes(), now)
+                            for key, vector in vectors.items()
+                        ],
+                    )
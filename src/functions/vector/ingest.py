@@ -0,0 +1,178 @@
+"""
+Streaming embed-and-upsert pipeline for crawled chunks.
+
+Chunks are ``put`` one at a time and grouped into embedding batches. A fixed
+number of embed workers pull batches off a bounded queue, and a single upsert
+worker regroups the results into size-bounded upsert batches. Both queues are
+bounded, so a fast crawler waits on ``put`` instead of piling chunks up in
+memory: peak memory depends on the queue sizes, not on the size of the crawl.
+
+Embed and upsert callables are synchronous (the Pinecone client is) and run
+in worker threads. Failures are retried with exponential backoff and full
+jitter; a rate-limit response pauses every embed worker until the
+``Retry-After`` delay has passed.
+"""
+
+import asyncio
+import time
+from typing import Callable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.functions.crawl.chunk import Chunk
+from src.functions.retry import backoff_delay, status_code
+from src.functions.vector.embedding import MAX_DOCUMENTS
+
+
+class IngestConfig(BaseModel):
+    embed_batch_size: int = Field(default=MAX_DOCUMENTS, description="Texts per embed call")
+    embed_concurrency: int = Field(default=4, description="Concurrent embed calls")
+    upsert_batch_size: int = Field(default=200, description="Vectors per upsert call")
+    queue_size: int = Field(
+        default=8, description="Batches buffered between stages before put() waits"
+    )
+    max_retries: int = Field(default=5, description="Retries per batch before failing")
+    base_delay: float = Field(default=0.5, description="First retry delay in seconds")
+    max_delay: float = Field(default=30.0, description="Upper bound of a retry delay")
+
+
+class IngestStats(BaseModel):
+    chunks: int = 0
+    embed_batches: int = 0
+    upsert_batches: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        embed: Callable[[List[str]], List[List[float]]],
+        upsert: Callable[[List[Chunk], List[List[float]]], None],
+        config: Optional[IngestConfig] = None,
+    ):
+        self.embed = embed
+        self.upsert = upsert
+        self.config = config or IngestConfig()
+        self.stats = IngestStats()
+        self._batch: List[Chunk] = []
+        self._embed_queue: Optional[asyncio.Queue] = None
+        self._upsert_queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._failed: Optional[asyncio.Event] = None
+        self._failure: Optional[BaseException] = None
+        self._paused_until = 0.0
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self._cancel()
+
+    def start(self):
+        self._embed_queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._upsert_queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._embed_workers = [
+            asyncio.create_task(self._embed_worker())
+            for _ in range(self.config.embed_concurrency)
+        ]
+        self._upsert_worker_task = asyncio.create_task(self._upsert_worker())
+        self._tasks = self._embed_workers + [self._upsert_worker_task]
+        self._failed = asyncio.Event()
+        for task in self._tasks:
+            task.add_done_callback(self._task_done)
+
+    async def put(self, chunk: Chunk):
+        self.stats.chunks += 1
+        self._batch.append(chunk)
+        if len(self._batch) >= self.config.embed_batch_size:
+            await self._put(self._embed_queue, self._batch)
+            self._batch = []
+
+    async def close(self) -> IngestStats:
+        try:
+            if self._batch:
+                await self._put(self._embed_queue, self._batch)
+                self._batch = []
+            for _ in self._embed_workers:
+                await self._put(self._embed_queue, None)
+            await asyncio.gather(*self._embed_workers)
+            await self._put(self._upsert_queue, None)
+            await self._upsert_worker_task
+        except BaseException:
+            await self._cancel()
+            raise
+        return self.stats
+
+    async def _cancel(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _task_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self._failure = self._failure or task.exception()
+            self._failed.set()
+
+    async def _put(self, queue: asyncio.Queue, item):
+        # Surface a failed stage instead of blocking forever on a full queue
+        putter = asyncio.ensure_future(queue.put(item))
+        failed = asyncio.ensure_future(self._failed.wait())
+        try:
+            await asyncio.wait([putter, failed], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            putter.cancel()
+            failed.cancel()
+        if self._failed.is_set():
+            raise self._failure
+
+    async def _embed_worker(self):
+        while True:
+            batch = await self._embed_queue.get()
+            if batch is None:
+                return
+            vectors = await self._with_retries(self.embed, [c.text for c in batch])
+            self.stats.embed_batches += 1
+            await self._put(self._upsert_queue, (batch, vectors))
+
+    async def _upsert_worker(self):
+        chunks: List[Chunk] = []
+        vectors: List[List[float]] = []
+        while True:
+            item = await self._upsert_queue.get()
+            if item is not None:
+                chunks.extend(item[0])
+                vectors.extend(item[1])
+            size = self.config.upsert_batch_size
+            while len(chunks) >= size or (item is None and chunks):
+                await self._with_retries(self.upsert, chunks[:size], vectors[:size])
+                self.stats.upsert_batches += 1
+                chunks, vectors = chunks[size:], vectors[size:]
+            if item is None:
+                return
+
+    async def _with_retries(self, fn, *args):
+        for attempt in range(self.config.max_retries + 1):
+            wait = self._paused_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await asyncio.to_thread(fn, *args)
+            except Exception as e:
+                if attempt == self.config.max_retries:
+                    raise
+                self.stats.retries += 1
+                delay = backoff_delay(
+                    e, attempt, self.config.base_delay, self.config.max_delay
+                )
+                if status_code(e) == 429:
+                    self.stats.rate_limited += 1
+                    self._paused_until = max(
+                        self._paused_until, time.monotonic() + delay
+                    )
+                print(f"Ingest call failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
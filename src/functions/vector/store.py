@@ -0,0 +1,402 @@
+"""
+Vector store backends behind one small interface.
+
+``PineconeStore`` wraps a Pinecone index. ``LocalVectorStore`` keeps each
+namespace in a directory holding a memory-mapped float32 matrix of
+L2-normalised vectors (so cosine similarity is a dot product) and a SQLite
+file mapping vector IDs to rows and metadata. Queries are exact batched
+top-k in numpy; with ``approximate=True`` large namespaces are searched
+through an inverted-file (IVF) index of k-means clusters that is rebuilt as
+the namespace grows.
+
+Both backends return Pinecone-shaped results, ``{"matches": [{"id",
+"score", "metadata"}]}``, so callers do not care which one they talk to.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.functions.vector.embedding import EMBED_DIMENSION
+
+INITIAL_CAPACITY = 1024
+IVF_MIN_ROWS = 50000
+
+
+class PineconeStore:
+    def __init__(self, index, query_concurrency: int = 8):
+        self.index = index
+        self.query_concurrency = query_concurrency
+
+    def upsert(self, vectors: List[dict], namespace: str):
+        self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def delete(self, ids: List[str], namespace: str):
+        self.index.delete(ids=ids, namespace=namespace)
+
+    def query(self, vector: List[float], top_k: int, namespace: str) -> dict:
+        return self.index.query(
+            namespace=namespace,
+            vector=vector,
+            top_k=top_k,
+            include_values=False,
+            include_metadata=True,
+        )
+
+    def query_many(self, vectors: List[List[float]], top_k: int, namespace: str):
+        # Pinecone has no multi-vector query; overlap the round trips instead
+        with ThreadPoolExecutor(self.query_concurrency) as pool:
+            return list(pool.map(lambda v: self.query(v, top_k, namespace), vectors))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    top_k = min(top_k, scores.shape[-1])
+    if top_k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, top_k - 1, axis=-1)[..., :top_k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class IVFIndex:
+    """Spherical k-means clusters over the rows that existed at build time."""
+
+    def __init__(
+        self, centroids: np.ndarray, lists: List[np.ndarray], built_rows: int
+    ):
+        self.centroids = centroids
+        self.lists = lists
+        self.built_rows = built_rows
+
+    @classmethod
+    def build(
+        cls, vectors: np.ndarray, nlist: int, iterations: int = 8, seed: int = 0
+    ):
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(vectors), nlist * 64)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        assignment = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), 65536):
+            block = vectors[start : start + 65536]
+            assignment[start : start + len(block)] = np.argmax(
+                block @ centroids.T, axis=1
+            )
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        lists = [order[bounds[c] : bounds[c + 1]] for c in range(nlist)]
+        return cls(centroids, lists, len(vectors))
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probes = _top_k(self.centroids @ query, nprobe)
+        return np.concatenate([self.lists[c] for c in probes])
+
+
+class _Namespace:
+    def __init__(self, directory: str, dimension: int):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "vectors.f32")
+        self.db = sqlite3.connect(
+            os.path.join(directory, "meta.db"), check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, "
+            "id TEXT UNIQUE NOT NULL, metadata TEXT, deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        row = self.db.execute("SELECT value FROM info WHERE key = 'dimension'").fetchone()
+        if row:
+            dimension = int(row[0])
+        else:
+            with self.db:
+                self.db.execute(
+                    "INSERT INTO info (key, value) VALUES ('dimension', ?)",
+                    (str(dimension),),
+                )
+        self.dimension = dimension
+        self.ivf: Optional[IVFIndex] = None
+        self.lock = threading.Lock()
+        self.data_version = self._data_version()
+        self.count = self._stored_count()
+        self._map(max(INITIAL_CAPACITY, self.count))
+        self._load_live()
+
+    def _data_version(self) -> int:
+        return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _stored_count(self) -> int:
+        return self.db.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM rows"
+        ).fetchone()[0]
+
+    def _load_live(self):
+        self.live = np.zeros(self.capacity, dtype=bool)
+        for (index,) in self.db.execute("SELECT row FROM rows WHERE deleted = 0"):
+            self.live[index] = True
+
+    def refresh(self):
+        """Pick up rows another process (the crawler) committed since last time.
+
+        ``data_version`` only changes on commits from other connections, so
+        this is a single pragma read while nobody else writes.
+        """
+        version = self._data_version()
+        if version == self.data_version:
+            return
+        self.data_version = version
+        self.count = max(self.count, self._stored_count())
+        self._grow(self.count)
+        self._load_live()
+
+    def _map(self, capacity: int):
+        size = capacity * self.dimension * 4
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < size:
+            with open(self.path, "ab") as f:
+                f.truncate(size)
+        self.capacity = capacity
+        self.vectors = np.memmap(
+            self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+        )
+
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self.vectors.flush()
+        del self.vectors
+        self._map(capacity)
+        live = np.zeros(capacity, dtype=bool)
+        live[: len(self.live)] = self.live
+        self.live = live
+
+    def _rows_for(self, ids: List[str]) -> Dict[str, int]:
+        found = {}
+        for i in range(0, len(ids), 500):
+            batch = ids[i : i + 500]
+            found.update(
+                self.db.execute(
+                    "SELECT id, row FROM rows WHERE id IN (%s)" % ",".join("?" * len(batch)),
+                    batch,
+                )
+            )
+        return found
+
+    def upsert(self, vectors: List[dict]):
+        ids = [v["id"] for v in vectors]
+        existing = self._rows_for(ids)
+        rows = []
+        for vector_id in ids:
+            if vector_id not in existing:
+                existing[vector_id] = self.count
+                self.count += 1
+            rows.append(existing[vector_id])
+        self._grow(self.count)
+        matrix = _normalize(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+        self.vectors[rows] = matrix
+        self.live[rows] = True
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO rows (row, id, metadata, deleted) VALUES (?, ?, ?, 0)",
+                [
+                    (row, v["id"], json.dumps(v.get("metadata") or {}))
+                    for row, v in zip(rows, vectors)
+                ],
+            )
+
+    def delete(self, ids: List[str]):
+        rows = list(self._rows_for(ids).values())
+        self.live[rows] = False
+        with self.db:
+            self.db.executemany(
+                "UPDATE rows SET deleted = 1 WHERE row = ?", [(row,) for row in rows]
+            )
+
+    def search(
+        self, queries: np.ndarray, top_k: int, nprobe: Optional[int]
+    ) -> List[dict]:
+        count = self.count
+        results = []
+        if self.ivf is None or nprobe is None:
+            scores = queries @ self.vectors[:count].T
+            scores[:, ~self.live[:count]] = -np.inf
+            for q_scores, top in zip(scores, _top_k(scores, top_k)):
+                results.append(self._matches(top, q_scores[top]))
+            return results
+        tail = np.arange(self.ivf.built_rows, count)
+        for query in queries:
+            rows = np.concatenate([self.ivf.candidates(query, nprobe), tail])
+            rows = rows[self.live[rows]]
+            scores = self.vectors[rows] @ query
+            top = _top_k(scores, top_k)
+            results.append(self._matches(rows[top], scores[top]))
+        return results
+
+    def _matches(self, rows: np.ndarray, scores: np.ndarray) -> dict:
+        rows = [int(r) for r, s in zip(rows, scores) if np.isfinite(s)]
+        found = {}
+        if rows:
+            found = {
+                row: (vector_id, metadata)
+                for row, vector_id, metadata in self.db.execute(
+                    "SELECT row, id, metadata FROM rows WHERE row IN (%s)"
+                    % ",".join("?" * len(rows)),
+                    rows,
+                )
+            }
+        return {
+            "matches": [
+                {
+                    "id": found[row][0],
+                    "score": float(score),
+                    "metadata": json.loads(found[row][1]),
+                }
+                for row, score in zip(rows, scores)
+                if row in found
+            ]
+        }
+
+
+class LocalVectorStore:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dimension: int = EMBED_DIMENSION,
+        approximate: bool = False,
+        nprobe: int = 8,
+        ivf_min_rows: int = IVF_MIN_ROWS,
+    ):
+        self.path = path or os.getenv("LOCAL_VECTOR_STORE_PATH", "vector_store")
+        self.dimension = dimension
+        self.approximate = approximate
+        self.nprobe = nprobe
+        self.ivf_min_rows = ivf_min_rows
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name: str) -> _Namespace:
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = _Namespace(
+                    os.path.join(self.path, name), self.dimension
+                )
+            return self._namespaces[name]
+
+    def upsert(self, vectors: List[dict], namespace: str):
+        ns = self.namespace(namespace)
+        with ns.lock:
+            ns.refresh()
+            ns.upsert(vectors)
+
+    def delete(self, ids: List[str], namespace: str):
+        ns = self.namespace(namespace)
+        with ns.lock:
+            ns.refresh()
+            ns.delete(ids)
+
+    def query(self, vector: List[float], top_k: int, namespace: str) -> dict:
+        return self.query_many([vector], top_k, namespace)[0]
+
+    def query_many(self, vectors: List[List[float]], top_k: int, namespace: str):
+        ns = self.namespace(namespace)
+        queries = _normalize(np.asarray(vectors, dtype=np.float32))
+        with ns.lock:
+            # The crawler writes from its own process; see what it added
+            ns.refresh()
+            self._refresh_ivf(ns)
+            nprobe = self.nprobe if ns.ivf is not None else None
+            return ns.search(queries, top_k, nprobe)
+
+    def build_ivf(self, namespace: str, nlist: Optional[int] = None):
+        ns = self.namespace(namespace)
+        with ns.lock:
+            self._build_ivf(ns, nlist)
+
+    def _refresh_ivf(self, ns: _Namespace):
+        # Rebuild once rows added since the last build make up a tenth of the index
+        if not self.approximate or ns.count < self.ivf_min_rows:
+            return
+        if ns.ivf is None or ns.count - ns.ivf.built_rows > ns.count // 10:
+            self._build_ivf(ns)
+
+    def _build_ivf(self, ns: _Namespace, nlist: Optional[int] = None):
+        nlist = nlist or max(1, int(np.sqrt(ns.count)))
+        ns.ivf = IVFIndex.build(np.asarray(ns.vectors[: ns.count]), nlist)
+
+    def load_jsonl(
+        self, path: str, namespace: Optional[str] = None, batch_size: int = 1000
+    ) -> int:
+        """Bulk load a Pinecone export of ``{"id", "values", "metadata"}`` lines.
+
+        A ``namespace`` field on a line overrides the ``namespace`` argument.
+        """
+        batches: Dict[str, List[dict]] = {}
+        loaded = 0
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                target = record.pop("namespace", None) or namespace or ""
+                batch = batches.setdefault(target, [])
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    self.upsert(batch, target)
+                    loaded += len(batch)
+                    batches[target] = []
+        for target, batch in batches.items():
+            if batch:
+                self.upsert(batch, target)
+                loaded += len(batch)
+        return loaded
+
+    def copy_from_pinecone(self, index, namespace: str, batch_size: int = 100) -> int:
+        """Copy a live Pinecone namespace by listing and fetching its IDs."""
+        copied = 0
+        for ids in index.list(namespace=namespace):
+            for i in range(0, len(ids), batch_size):
+                fetched = index.fetch(ids=ids[i : i + batch_size], namespace=namespace)
+                vectors = [
+                    {"id": v.id, "values": v.values, "metadata": v.metadata}
+                    for v in fetched.vectors.values()
+                ]
+                self.upsert(vectors, namespace)
+                copied += len(vectors)
+        return copied
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Bulk load a Pinecone JSONL export into the local vector store"
+    )
+    parser.add_argument("export", help="JSONL file of {id, values, metadata} records")
+    parser.add_argument("--namespace", default="ns1")
+    parser.add_argument("--path", default=None, help="Local store directory")
+    args = parser.parse_args()
+    loaded = LocalVectorStore(args.path).load_jsonl(args.export, args.namespace)
+    print(f"Loaded {loaded} vectors into namespace {args.namespace}")
@@ -0,0 +1,63 @@
+"""
+Monotonic version number of the vector index contents.
+
+Ingestion bumps the version after it changes the index; readers fold the
+version into their cache keys, so answers built on an older index stop
+matching without any explicit invalidation. The counter lives in a SQLite
+file (``INDEX_VERSION_PATH``, by default the crawl state file) that the
+crawler and every backend worker can open. Readers re-read it at most every
+``refresh_interval`` seconds.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO index_version (id, version) VALUES (1, 0);
+"""
+
+
+class IndexVersion:
+    def __init__(self, path: Optional[str] = None, refresh_interval: float = 5.0):
+        self.path = path or os.getenv("INDEX_VERSION_PATH", "crawl_state.db")
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._version = 0
+        self._read_at = float("-inf")
+
+    def current(self) -> int:
+        with self._lock:
+            if time.monotonic() - self._read_at >= self.refresh_interval:
+                self._version = self._read()
+                self._read_at = time.monotonic()
+            return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            with self._db() as db:
+                db.execute("UPDATE index_version SET version = version + 1")
+            self._version = self._read()
+            self._read_at = time.monotonic()
+            return self._version
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _read(self) -> int:
+        return self._db().execute("SELECT version FROM index_version").fetchone()[0]
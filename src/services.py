@@ -1,23 +1,31 @@
 import asyncio
+import os
 from src.client import client
 from src.functions.llm.chat import llm_chat
+from src.functions.llm.summarize import llm_summarize
 from src.functions.hn.search import hn_search
-from src.workflows.workflow import hn_workflow
+from src.functions.crawl.web import web_crawler
+from src.workflows.workflow import hn_workflow, crawl_website_and_store
 from src.functions.crawl.website import crawl_website
+from src.functions.sendNotification.MailerSend import send_email, send_digest
 from restack_ai.restack import ServiceOptions
 
+# llm_chat queue throughput; the shared LLM client adapts below these limits
+LLM_CHAT_RATE_LIMIT = int(os.getenv("LLM_CHAT_RATE_LIMIT", "10"))
+LLM_CHAT_CONCURRENCY = int(os.getenv("LLM_CHAT_CONCURRENCY", "8"))
+
 async def main():
     await asyncio.gather(
         client.start_service(
-            workflows=[hn_workflow],
-            functions=[hn_search, crawl_website]
+            workflows=[hn_workflow, crawl_website_and_store],
+            functions=[hn_search, crawl_website, web_crawler, send_email, send_digest]
         ),
         client.start_service(
-            functions=[llm_chat],
+            functions=[llm_chat, llm_summarize],
             task_queue="llm_chat",
             options=ServiceOptions(
-                rate_limit=1,
-                max_concurrent_function_runs=1
+                rate_limit=LLM_CHAT_RATE_LIMIT,
+                max_concurrent_function_runs=LLM_CHAT_CONCURRENCY
             )
         )
     )
@@ -1,14 +1,18 @@
+import asyncio
 from datetime import timedelta
 from typing import List
 from restack_ai.workflow import workflow, import_functions, log
 
-from src.functions.crawl.web import web_crawler
-
 with import_functions():
+    from src.functions.crawl.web import web_crawler
     from src.functions.hn.search import hn_search
-    from src.functions.hn.schema import HnSearchInput
+    from src.functions.hn.schema import HnSearchInput, trim_hn_results
     from src.functions.crawl.website import crawl_website
-    from src.functions.llm.chat import llm_chat, FunctionInputParams
+    from src.functions.llm.summarize import llm_summarize, SummarizeInput
+
+
+# Pages crawled and summarized at once unless the input sets "parallelism"
+DEFAULT_PARALLELISM = 10
 
 
 @workflow.defn(name="hn_workflow")
@@ -18,46 +22,55 @@ class hn_workflow:
 
         query = input["query"]
         count = input["count"]
+        slots = asyncio.Semaphore(input.get("parallelism", DEFAULT_PARALLELISM))
         hn_results = await workflow.step(
             hn_search,
             HnSearchInput(query=query, count=count),
             start_to_close_timeout=timedelta(seconds=10),
         )
-        urls = [hit["url"] for hit in hn_results["hits"] if "url" in hit]
+        urls = [hit["url"] for hit in hn_results["hits"] if hit.get("url")]
 
-        crawled_contents = []
-        for url in urls:  # Use the extracted URLs
+        # Each page is summarized as soon as it is crawled; a page that fails
+        # either step is dropped instead of failing the run
+        async def crawl_and_summarize(url):
             log.info("hn_result", extra={"url": url})
-            if url:
-                content = await workflow.step(
-                    crawl_website, url, start_to_close_timeout=timedelta(seconds=30)
-                )
-                crawled_contents.append(content)
+            async with slots:
+                try:
+                    content = await workflow.step(
+                        crawl_website, url, start_to_close_timeout=timedelta(seconds=30)
+                    )
+                    system_prompt = f"Provide a summary of the website for project found on Hacker news"
+                    # Oversized pages are split, summarized and merged within budget
+                    return await workflow.step(
+                        llm_summarize,
+                        SummarizeInput(system_prompt=system_prompt, content=content),
+                        task_queue="llm_chat",
+                        start_to_close_timeout=timedelta(seconds=300),
+                    )
+                except Exception as e:
+                    log.warning("hn_result skipped", extra={"url": url, "error": str(e)})
+                    return None
 
-        summaries = []
-        for content in crawled_contents:
-            system_prompt = (
-                f"Provide a summary of the website for project found on Hacker news"
-            )
-            user_prompt = f"Summarize the following content: {content}"
-            summary = await workflow.step(
-                llm_chat,
-                FunctionInputParams(
-                    system_prompt=system_prompt, user_prompt=user_prompt
-                ),
-                task_queue="llm_chat",
-                start_to_close_timeout=timedelta(seconds=120),
-            )
-            summaries.append(summary)
+        results = await asyncio.gather(*(crawl_and_summarize(url) for url in urls))
+        summaries = [summary for summary in results if summary is not None]
+        log.info(
+            "hn_workflow summaries",
+            extra={"summarized": len(summaries), "failed": len(urls) - len(summaries)},
+        )
 
         system_prompt = f"You are a personal assistant. Provide a summary of the latest hacker news and the summaries of the websites. Structure your response with the title of the project, then a short description and a list of actionable bullet points."
-        user_prompt = f"Here is the latest hacker news data: {str(hn_results)} and summaries of the websites: {str(summaries)}"
+        stories = trim_hn_results(hn_results)
+        prompt = f"Here is the latest hacker news data: {str(stories)} and summaries of the websites: {{content}}"
 
         return await workflow.step(
-            llm_chat,
-            FunctionInputParams(system_prompt=system_prompt, user_prompt=user_prompt),
+            llm_summarize,
+            SummarizeInput(
+                system_prompt=system_prompt,
+                prompt=prompt,
+                content="\n\n".join(summaries),
+            ),
             task_queue="llm_chat",
-            start_to_close_timeout=timedelta(seconds=120),
+            start_to_close_timeout=timedelta(seconds=300),
         )
 
 
@@ -66,5 +79,5 @@ class crawl_website_and_store:
     @workflow.run
     async def run(self, urls: List[str]):
         return await workflow.step(
-            web_crawler, urls, start_to_close_timeout=timedelta(seconds=30)
+            web_crawler, urls, start_to_close_timeout=timedelta(minutes=30)
         )